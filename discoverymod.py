@@ -0,0 +1,121 @@
+# MicroPython
+# MIT license
+"""Поиск расширителей ввода-вывода на шине I2C и определение их типа (PCF8574, XCA9555, MCP23x17).
+Результат сохраняется в файле и при следующих запусках используется без опроса микросхем,
+если набор адресов на шине не изменился.
+I2C bus discovery and I/O expander chip identification with the result cached in a file."""
+
+from sensor_pack_2.bus_service import I2cAdapter
+
+# имя типа: (модуль, класс драйвера)
+_drivers = {
+    "PCF8574": ("pcf8574mod", "PCF8574"),
+    "XCA9555": ("xca9555mod", "XCA9555"),
+    "MCP23x17": ("mcp23x17mod", "MCP23x17"),
+}
+
+CACHE_FILE = "ioexp_cache.json"
+
+
+def _read(adapter: I2cAdapter, address: int, reg: int, count: int = 1) -> [bytes, None]:
+    try:
+        return adapter.read_register(address, reg, count)
+    except OSError:
+        return None
+
+
+def _is_xca9555(adapter: I2cAdapter, address: int) -> bool:
+    """Положительная проверка XCA9555: регистр инверсии входов 4 записывается по адресу 0xFC (используются только
+    младшие три бита адреса регистра) и читается обратно по адресам 0xFC и 0x04, затем восстанавливается.
+    У MCP23x17 адрес 0xFC не реализован, поэтому запись в него ничего не изменяет. Инверсия влияет только на
+    чтение входов, после восстановления входы читаются, чтобы сбросить возможный запрос прерывания."""
+    old = _read(adapter, address, 0xFC)
+    if old is None:
+        return False
+    probe = 0xFF ^ old[0]
+    try:
+        adapter.write_register(address, 0xFC, probe, 1, "big")
+        result = _read(adapter, address, 0xFC) == _read(adapter, address, 0x04) == bytes((probe,))
+        adapter.write_register(address, 0xFC, old[0], 1, "big")
+        _read(adapter, address, 0x00, 2)
+    except OSError:
+        return False
+    return result
+
+
+def identify(adapter: I2cAdapter, address: int) -> [str, None]:
+    """Возвращает имя типа расширителя ввода-вывода (ключ _drivers) с адресом address или None.
+    Определение эвристическое, настройка портов не изменяется:
+        * 0x38..0x3F - адреса только PCF8574A;
+        * PCF8574 не имеет регистров: байт 'адреса регистра' защелкивается на выходах и читается обратно
+          (с учетом выводов, замкнутых на землю снаружи). Проверка адресами 0xFF и 0xF7 кратковременно
+          устанавливает 0 только на P3, после определения на выходы записывается 0xFF (состояние после POR).
+          Если P3 замкнут на землю снаружи, PCF8574 не определяется, используйте create_driver;
+        * XCA9555 (PCA9555/TCA9555) использует только младшие три бита адреса регистра: смотри _is_xca9555;
+        * у MCP23x17 один регистр IOCON доступен по двум адресам: 0x0A и 0x0B (IOCON.BANK = 0) или
+          0x05 и 0x15 (IOCON.BANK = 1), бит 0 IOCON всегда читается как 0."""
+    if 0x38 <= address <= 0x3F:
+        return "PCF8574"
+    hi = _read(adapter, address, 0xFF)
+    lo = _read(adapter, address, 0xF7)
+    if hi is not None and lo is not None and hi[0] & 0x08 and lo[0] == hi[0] & 0xF7:
+        adapter.write(address, b"\xff")
+        return "PCF8574"
+    if _is_xca9555(adapter, address):
+        return "XCA9555"
+    # IOCON.BANK = 0
+    raw = _read(adapter, address, 0x0A, 2)
+    if raw is not None and raw[0] == raw[1] and not raw[0] & 0x81:
+        return "MCP23x17"
+    # IOCON.BANK = 1
+    raw, raw_b = _read(adapter, address, 0x05), _read(adapter, address, 0x15)
+    if raw is not None and raw == raw_b and 0x80 == raw[0] & 0x81:
+        return "MCP23x17"
+    return None
+
+
+def _load_cache(cache_file: str) -> dict:
+    import json
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_file: str, cache: dict):
+    import json
+    try:
+        with open(cache_file, "w") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass    # файловая система только для чтения, результат не сохраняется
+
+
+def discover(adapter: I2cAdapter, bus_id: int = 0, cache_file: [str, None] = CACHE_FILE) -> dict:
+    """Возвращает словарь {адрес: имя типа} расширителей ввода-вывода на шине.
+    bus_id - номер шины (ключ в файле кэша); cache_file - имя файла кэша или None (без кэша).
+    Если набор адресов, ответивших на bus.scan(), совпадает с сохраненным в кэше, микросхемы не опрашиваются."""
+    addresses = sorted(a for a in adapter.bus.scan() if 0x20 <= a <= 0x27 or 0x38 <= a <= 0x3F)
+    key = str(bus_id)
+    cache = _load_cache(cache_file) if cache_file else {}
+    cached = cache.get(key)
+    if cached is not None and sorted(int(a) for a in cached) == addresses:
+        return {int(a): name for a, name in cached.items() if name is not None}
+    found = {a: identify(adapter, a) for a in addresses}
+    if cache_file:
+        cache[key] = {str(a): name for a, name in found.items()}
+        _save_cache(cache_file, cache)
+    return {a: name for a, name in found.items() if name is not None}
+
+
+def create_driver(adapter: I2cAdapter, address: int, name: str):
+    """Создает экземпляр драйвера расширителя ввода-вывода типа name (смотри identify)"""
+    module_name, class_name = _drivers[name]
+    module = __import__(module_name)
+    return getattr(module, class_name)(adapter, address)
+
+
+def create_expanders(adapter: I2cAdapter, bus_id: int = 0, cache_file: [str, None] = CACHE_FILE) -> dict:
+    """Возвращает словарь {адрес: экземпляр драйвера} всех найденных на шине расширителей ввода-вывода"""
+    return {a: create_driver(adapter, a, name) for a, name in discover(adapter, bus_id, cache_file).items()}
@@ -0,0 +1,159 @@
+# MicroPython
+# MIT license
+"""Символьный ЖКИ HD44780 (16x2, 20x4 и т. д.), подключенный через плату-переходник с PCF8574.
+Изображение формируется в буфере кадра, а на ЖКИ передаются только изменившиеся участки строк.
+HD44780 character LCD over a PCF8574 backpack with a framebuffer and changed-run updates."""
+
+import time
+from pcf8574mod import PCF8574, LCD_RS, LCD_BL, lcd_nibble_to_stream, lcd_bytes_to_stream
+
+# команды HD44780
+_CMD_CLEAR = 0x01
+_CMD_ENTRY_MODE = 0x06      # сдвиг курсора вправо
+_CMD_DISPLAY_ON = 0x0C      # без курсора
+_CMD_FUNCTION_SET = 0x28    # 4-битный интерфейс, две строки, шрифт 5x8
+_CMD_SET_CGRAM = 0x40
+_CMD_SET_DDRAM = 0x80
+
+# изменившиеся участки строки, разделенные не более чем таким кол-вом неизменных символов, передаются
+# одним участком. Команда установки адреса стоит столько же, сколько один символ (4 байта шины).
+_MAX_GAP = 1
+
+
+class HD44780:
+    """Символьный ЖКИ HD44780 на PCF8574. Методы вывода текста изменяют только буфер кадра в памяти MCU.
+    Метод refresh сравнивает буфер кадра с копией содержимого ЖКИ и передает каждый изменившийся участок строки
+    одной записью по шине I2C (PCF8574.write_stream): команда установки адреса и коды символов со стробами E.
+    Буферы создаются один раз. При частоте шины 400 кГц передача символа занимает 90 мкс, что больше времени
+    выполнения команды HD44780 (37 мкс), поэтому флаг занятости ЖКИ не читается."""
+
+    def __init__(self, expander: PCF8574, cols: int = 20, rows: int = 4, backlight: bool = True):
+        """expander - PCF8574 платы-переходника; cols, rows - кол-во символов в строке и строк;
+        backlight - включение подсветки."""
+        if not 0 < rows <= 4 or not 0 < cols <= 40:
+            raise ValueError(f"Неверный размер ЖКИ: {cols}x{rows}")
+        self._expander = expander
+        self._cols = cols
+        self._rows = rows
+        self._bl = LCD_BL if backlight else 0
+        # адрес DDRAM начала строки. Третья и четвертая строки - продолжение первой и второй
+        self._row_addr = (0x00, 0x40, cols, 0x40 + cols)
+        # буфер кадра и содержимое ЖКИ
+        self._frame = bytearray(b" " * (cols * rows))
+        self._shadow = bytearray(cols * rows)
+        # буфер передачи: команда установки адреса и строка символов, по 4 байта шины на байт
+        self._stream = bytearray(4 * max(1 + cols, 8))
+        self._stream_mv = memoryview(self._stream)
+        self.init()
+
+    @property
+    def cols(self) -> int:
+        return self._cols
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def _command(self, cmd: int):
+        end = lcd_bytes_to_stream(self._stream, 0, (cmd,), False, self._bl)
+        self._expander.write_stream(self._stream_mv[:end])
+
+    def init(self):
+        """Инициализация ЖКИ в 4-битном режиме (по описанию HD44780, 'Initializing by Instruction')"""
+        exp, buf = self._expander, self._stream
+        time.sleep_ms(50)
+        exp.write_port(0, self._bl)
+        for delay_us in (4500, 150, 150):
+            lcd_nibble_to_stream(buf, 0, 0x03, self._bl)
+            exp.write_stream(self._stream_mv[:2])
+            time.sleep_us(delay_us)
+        lcd_nibble_to_stream(buf, 0, 0x02, self._bl)
+        exp.write_stream(self._stream_mv[:2])
+        for cmd in (_CMD_FUNCTION_SET, _CMD_DISPLAY_ON, _CMD_CLEAR, _CMD_ENTRY_MODE):
+            self._command(cmd)
+            if cmd == _CMD_CLEAR:
+                time.sleep_ms(2)
+        # после очистки на ЖКИ пробелы, следующий refresh передаст все остальное
+        shadow = self._shadow
+        for i in range(len(shadow)):
+            shadow[i] = 0x20
+
+    def set_backlight(self, value: bool):
+        """Включение/выключение подсветки"""
+        self._bl = LCD_BL if value else 0
+        self._expander.write_port(0, self._bl)
+
+    def create_char(self, location: int, pattern):
+        """Записывает в CGRAM символ с кодом location (0..7). pattern - 8 байт, строки символа 5x8"""
+        if not 0 <= location < 8:
+            raise ValueError(f"Неверный код символа: {location}")
+        self._command(_CMD_SET_CGRAM | (location << 3))
+        end = lcd_bytes_to_stream(self._stream, 0, pattern, True, self._bl)
+        self._expander.write_stream(self._stream_mv[:end])
+        # символы с этим кодом на ЖКИ изменятся
+        shadow = self._shadow
+        for i in range(len(shadow)):
+            if shadow[i] == location:
+                shadow[i] = 0xFF ^ location
+
+    def clear(self):
+        """Заполняет буфер кадра пробелами"""
+        frame = self._frame
+        for i in range(len(frame)):
+            frame[i] = 0x20
+
+    def print_at(self, col: int, row: int, text: [str, bytes]):
+        """Записывает text в буфер кадра, начиная с позиции col строки row. Не поместившиеся символы отбрасываются"""
+        if not 0 <= row < self._rows or not 0 <= col < self._cols:
+            raise ValueError(f"Неверная позиция: {col}, {row}")
+        if isinstance(text, str):
+            text = text.encode()
+        n = min(len(text), self._cols - col)
+        start = row * self._cols + col
+        self._frame[start:start + n] = text[:n]
+
+    def put_char(self, col: int, row: int, code: int):
+        """Записывает символ с кодом code в буфер кадра"""
+        self._frame[row * self._cols + col] = code
+
+    def invalidate(self):
+        """Помечает весь экран как изменившийся. Следующий refresh передаст его целиком"""
+        frame, shadow = self._frame, self._shadow
+        for i in range(len(shadow)):
+            shadow[i] = 0xFF ^ frame[i]
+
+    def _send_run(self, row: int, first: int, last: int):
+        """Передает символы first..last (включительно) строки row одной записью по шине"""
+        frame, shadow, buf, bl = self._frame, self._shadow, self._stream, self._bl
+        addr = _CMD_SET_DDRAM | (self._row_addr[row] + first)
+        end = lcd_nibble_to_stream(buf, 0, addr >> 4, bl)
+        end = lcd_nibble_to_stream(buf, end, addr & 0x0F, bl)
+        ctrl = LCD_RS | bl
+        for i in range(row * self._cols + first, row * self._cols + last + 1):
+            code = frame[i]
+            end = lcd_nibble_to_stream(buf, end, code >> 4, ctrl)
+            end = lcd_nibble_to_stream(buf, end, code & 0x0F, ctrl)
+            shadow[i] = code
+        self._expander.write_stream(self._stream_mv[:end])
+
+    def refresh(self) -> int:
+        """Передает на ЖКИ изменившиеся участки буфера кадра. Возвращает кол-во записей по шине"""
+        cols, frame, shadow = self._cols, self._frame, self._shadow
+        writes = 0
+        for row in range(self._rows):
+            base = row * cols
+            first = last = -1
+            for col in range(cols):
+                if frame[base + col] == shadow[base + col]:
+                    continue
+                if first < 0:
+                    first = col
+                elif col - last > 1 + _MAX_GAP:
+                    self._send_run(row, first, last)
+                    writes += 1
+                    first = col
+                last = col
+            if first >= 0:
+                self._send_run(row, first, last)
+                writes += 1
+        return writes
@@ -0,0 +1,103 @@
+# MicroPython
+# MIT license
+"""Обнаружение сброса расширителей ввода-вывода (пропадание питания, brown-out) по 'отпечатку' настройки.
+После сброса расширитель молча возвращается в состояние после POR (PCA9555 - все выводы входы,
+MCP23x17 - IOCON.BANK = 0), и выходы перестают работать. Монитор периодически читает небольшой отпечаток
+настройки, сравнивает его с копией состояния в драйвере и, если он отличается, заново настраивает расширитель.
+Brown-out/reset detection by cheap configuration fingerprint checks with automatic re-configuration."""
+
+import time
+
+
+class _Device:
+    """Расширитель под наблюдением"""
+    __slots__ = ("expander", "restore", "buf")
+
+    def __init__(self, expander, restore):
+        self.expander = expander
+        self.restore = restore
+        self.buf = bytearray(expander.fingerprint_size)
+
+
+class HealthMonitor:
+    """Следит за расширителями ввода-вывода (IOExpander). Отпечаток читает сам драйвер (read_fingerprint):
+        * XCA9555 - регистры направления 6 и 7, одно чтение двух байт;
+        * MCP23x17 - IOCON по адресу текущей адресации (после POR по этому адресу другой регистр или IOCON = 0).
+          Если драйвер записал в IOCON 0 (значение после POR), сброс обнаружить нельзя!;
+        * PCF8574 - значение порта: выводы, в которые записан 0, должны читаться как 0 (после POR в порту 0xFF).
+    При обнаружении сброса драйвер записывает в микросхему копию состояния (restore_state): значения выходов и
+    настройку всех портов (у MCP23x17 и IOCON). Копия обновляется драйвером при записи в порты и их настройке.
+    Обмен по шине ограничен бюджетом budget_bytes_per_s байт в секунду: метод service выполняет не более
+    одной проверки за вызов и только если бюджет это позволяет, поэтому он не задерживает обычный обмен."""
+
+    def __init__(self, budget_bytes_per_s: int = 100):
+        """budget_bytes_per_s - наибольшее кол-во байт в секунду на шине I2C, расходуемых монитором"""
+        if budget_bytes_per_s < 1:
+            raise ValueError(f"Неверный бюджет монитора: {budget_bytes_per_s} байт/с")
+        self._budget = budget_bytes_per_s
+        self._devices = []
+        self._next = 0
+        # время (ticks_ms), после которого разрешена следующая проверка
+        self._allowed_at = time.ticks_ms()
+        # счетчики: проверок, обнаруженных сбросов, ошибок шины
+        self.checks = self.resets = self.bus_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def add(self, expander, restore=None):
+        """Добавляет расширитель под наблюдение. Вызывать после настройки расширителя: копия его состояния
+        (значения выходов и настройка портов) читается из микросхемы.
+        restore - функция без параметров, вызываемая после восстановления состояния (например, PinMap.apply
+        или настройка прерываний MCP23x17, не входящая в копию состояния). Может быть None."""
+        if not expander.fingerprint_size:
+            raise ValueError(f"Неподдерживаемый расширитель: {expander.__class__.__name__}")
+        expander.save_state()
+        self._devices.append(_Device(expander, restore))
+
+    def rebaseline(self):
+        """Читает копии состояния всех расширителей из микросхем заново. Вызывать после настройки расширителей
+        в обход их драйверов"""
+        for dev in self._devices:
+            dev.expander.save_state()
+
+    def check(self, expander) -> bool:
+        """Проверяет отпечаток расширителя без учета бюджета. Если он отличается от ожидаемого, расширитель
+        настраивается заново. Возвращает Ложь, если был обнаружен сброс."""
+        for dev in self._devices:
+            if dev.expander is expander:
+                return self._check(dev)
+        raise ValueError("Расширитель не под наблюдением!")
+
+    def _check(self, dev: _Device) -> bool:
+        self.checks += 1
+        try:
+            if dev.expander.read_fingerprint(dev.buf):
+                return True
+            self.resets += 1
+            dev.expander.restore_state()
+            if dev.restore is not None:
+                dev.restore()
+        except OSError:
+            # недоступное устройство не настраивается, сбой шины обрабатывает адаптер шины
+            self.bus_errors += 1
+            return True
+        return False
+
+    def service(self) -> int:
+        """Проверяет очередной расширитель, если это позволяет бюджет. Вызывается периодически, например,
+        в цикле программы между операциями ввода-вывода. Возвращает время в мс до следующей разрешенной проверки
+        или -1, если под наблюдением нет ни одного расширителя."""
+        if not self._devices:
+            return -1
+        now = time.ticks_ms()
+        wait = time.ticks_diff(self._allowed_at, now)
+        if wait > 0:
+            return wait
+        dev = self._devices[self._next]
+        self._next = (1 + self._next) % len(self._devices)
+        self._check(dev)
+        # пауза, за которую 'накапливается' бюджет на выполненную проверку
+        pause = 1000 * dev.expander.fingerprint_cost // self._budget
+        self._allowed_at = time.ticks_add(now, pause)
+        return pause
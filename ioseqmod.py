@@ -0,0 +1,181 @@
+# MicroPython
+# MIT license
+"""Воспроизведение последовательностей состояний выходов расширителей ввода-вывода (светодиоды, шаговые
+двигатели и т. д.) по заранее вычисленной таблице кадров.
+Output pattern sequencer playing precomputed frame tables on I/O expander outputs."""
+
+import time
+from array import array
+from sensor_pack_2.ioexpander import IOExpander
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+
+class Pattern:
+    """Последовательность кадров. Кадр - значения портов (по одному слову на порт) и его длительность в мс."""
+
+    def __init__(self, frames: array, durations: array, port_count: int = 1):
+        """frames - array('H') значений портов: кадр 0 (порт 0, порт 1, ...), кадр 1 (...) и т. д.;
+        durations - array('H') длительностей кадров, мс;
+        port_count - кол-во портов в кадре."""
+        if not durations or len(frames) != port_count * len(durations):
+            raise ValueError(f"Размер таблицы кадров {len(frames)} не равен {port_count} * {len(durations)}!")
+        for d in durations:
+            if d < 1:
+                raise ValueError(f"Неверная длительность кадра: {d} мс")
+        self.frames = frames
+        self.durations = durations
+        self.port_count = port_count
+
+    def __len__(self) -> int:
+        """Кол-во кадров"""
+        return len(self.durations)
+
+
+class PatternSequencer:
+    """Воспроизводит Pattern на портах расширителя ввода-вывода. Время смены кадров отсчитывается от времени
+    смены предыдущего кадра, а не от момента вызова service, поэтому ошибка времени не накапливается.
+    В порт записывается значение, только если оно изменилось по сравнению с предыдущим кадром.
+    Смена последовательности может быть плавной (crossfade): в течение заданного кол-ва кадров кадры новой
+    последовательности выводятся все чаще, а старой все реже. В процессе воспроизведения память не выделяется."""
+
+    def __init__(self, expander: IOExpander, pattern: Pattern, ports: tuple = (0,), loop: bool = True):
+        """expander - расширитель ввода-вывода;
+        pattern - последовательность кадров;
+        ports - номера портов расширителя, соответствующие словам кадра;
+        loop - если Истина, то воспроизведение повторяется по кругу."""
+        for n_port in ports:
+            expander._check_port_numb(n_port)
+        self._expander = expander
+        self._ports = ports
+        self._loop = loop
+        # последние записанные в порты значения
+        self._latch = array("H", (0 for _ in ports))
+        self._latch_valid = False
+        self._pattern = None
+        self._old_pattern = None
+        self._step = self._old_step = 0
+        # плавная смена последовательностей: всего кадров, осталось кадров, аккумулятор 'смешивания'
+        self._fade_total = self._fade_left = self._fade_acc = 0
+        self._deadline = 0
+        self._running = False
+        self._timer = None
+        self._service_ref = self.service
+        self._set_pattern(pattern)
+
+    def _set_pattern(self, pattern: Pattern):
+        if pattern.port_count != len(self._ports):
+            raise ValueError(f"Кол-во портов в кадре {pattern.port_count} не равно {len(self._ports)}!")
+        self._pattern = pattern
+        self._step = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def step(self) -> int:
+        """Номер текущего кадра"""
+        return self._step
+
+    def set_pattern(self, pattern: Pattern, crossfade: int = 0):
+        """Заменяет воспроизводимую последовательность. crossfade - кол-во кадров плавного перехода, 0 - сразу."""
+        if crossfade > 0 and self._running:
+            self._old_pattern = self._pattern
+            self._old_step = self._step
+            self._fade_total = self._fade_left = crossfade
+            self._fade_acc = 0
+        else:
+            self._old_pattern = None
+            self._fade_left = 0
+        self._set_pattern(pattern)
+
+    def _output(self, pattern: Pattern, step: int):
+        """Записывает кадр step в порты, значение которых изменилось"""
+        frames, latch, exp = pattern.frames, self._latch, self._expander
+        base = step * len(latch)
+        for i in range(len(latch)):
+            val = frames[base + i]
+            if self._latch_valid and latch[i] == val:
+                continue
+            exp.write_port(self._ports[i], val)
+            latch[i] = val
+        self._latch_valid = True
+
+    def _output_current(self):
+        """Записывает в порты текущий кадр с учетом плавной смены последовательностей"""
+        if self._fade_left:
+            # доля кадров новой последовательности растет линейно (накопление ошибки, как у алгоритма Брезенхэма)
+            total = self._fade_total
+            self._fade_acc += total - self._fade_left
+            if self._fade_acc < total:
+                self._output(self._old_pattern, self._old_step)
+                return
+            self._fade_acc -= total
+        self._output(self._pattern, self._step)
+
+    def _advance(self) -> bool:
+        """Переход к следующему кадру. Возвращает Ложь, если последовательность закончилась"""
+        pattern = self._pattern
+        self._deadline = time.ticks_add(self._deadline, pattern.durations[self._step])
+        if self._fade_left:
+            self._fade_left -= 1
+            self._old_step = (1 + self._old_step) % len(self._old_pattern)
+            if not self._fade_left:
+                self._old_pattern = None
+        step = 1 + self._step
+        if step == len(pattern):
+            if not self._loop:
+                return False
+            step = 0
+        self._step = step
+        return True
+
+    def _frame_end(self) -> int:
+        """Возвращает время (time.ticks_ms) окончания текущего кадра"""
+        return time.ticks_add(self._deadline, self._pattern.durations[self._step])
+
+    def begin(self):
+        """Выводит первый кадр и запускает отсчет времени"""
+        self._step = 0
+        self._latch_valid = False
+        self._deadline = time.ticks_ms()
+        self._running = True
+        self._output(self._pattern, 0)
+
+    def service(self, _=None) -> int:
+        """Выводит кадр, время которого наступило. Вызывается периодически (таймером или в цикле программы).
+        Если время нескольких кадров прошло, выводится только последний из них.
+        Возвращает время в мс до смены кадра или -1, если воспроизведение закончено."""
+        if not self._running:
+            return -1
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._frame_end()) < 0:
+            return time.ticks_diff(self._frame_end(), now)
+        while time.ticks_diff(now, self._frame_end()) >= 0:
+            if not self._advance():
+                self._running = False
+                return -1
+        self._output_current()
+        return time.ticks_diff(self._frame_end(), now)
+
+    def _on_timer(self, timer):
+        micropython.schedule(self._service_ref, None)
+
+    def start(self, timer, period_ms: int = 1):
+        """Запуск воспроизведения по таймеру. timer - экземпляр machine.Timer;
+        period_ms - период вызова service, мс. Определяет точность смены кадров."""
+        self.stop()
+        self.begin()
+        self._timer = timer
+        timer.init(period=period_ms, mode=timer.PERIODIC, callback=self._on_timer)
+
+    def stop(self):
+        """Остановка воспроизведения"""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        self._running = False
@@ -26,6 +26,9 @@ if __name__ == '__main__':
     io_expander : IOExpander = XCA9555(adapter)
     # io_expander : IOExpander = MCP23x17(adapter)
     # io_expander : IOExpander = PCF8574(adapter=adapter, address=0x20)
+    # или автоматическое определение типа микросхемы. Or automatic chip identification:
+    # from discoverymod import create_expanders
+    # io_expander : IOExpander = next(iter(create_expanders(adapter, bus_id=1).values()))
     print(io_expander.__class__.__name__)
     val = io_expander.get_port_value()
     print("Информация о портах ввода-вывода. Information about input/output ports.")
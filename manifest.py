@@ -0,0 +1,18 @@
+# Манифест для 'заморозки' байт-кода библиотеки в прошивку MicroPython (frozen bytecode).
+# Manifest for freezing the library bytecode into MicroPython firmware.
+# Пример сборки прошивки для RP2040 / Firmware build example for RP2040:
+#   make -C ports/rp2 BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/libIOExpander/manifest.py
+# Манифест платы по умолчанию подключается строкой include("$(PORT_DIR)/boards/manifest.py")
+include("$(PORT_DIR)/boards/manifest.py")
+
+package("sensor_pack_2", opt=3)
+module("pcf8574mod.py", opt=3)
+module("xca9555mod.py", opt=3)
+module("mcp23x17mod.py", opt=3)
+module("ioseqmod.py", opt=3)
+module("swpwmmod.py", opt=3)
+module("steppermod.py", opt=3)
+module("hd44780mod.py", opt=3)
+module("discoverymod.py", opt=3)
+module("pinmapmod.py", opt=3)
+module("healthmod.py", opt=3)
@@ -1,21 +1,48 @@
 """MCP23x17 I2C/SPI IO-Expander/Расширитель ввода-вывода"""
 
 import micropython
-from machine import Pin
 from sensor_pack_2 import bus_service
-from sensor_pack_2.ioexpander import IOExpander, port_config_raw
-from sensor_pack_2.base_sensor import DeviceEx, check_value
-
-from collections import namedtuple
+from sensor_pack_2.ioexpander import IOExpander, port_config_raw, PortConfigRaw
+from sensor_pack_2.base_sensor import DeviceEx, check_value, check_value_fmt, lazy_namedtuple, MutableRecord
 
 int_cfg_fields = "gp_int_en dev_val int_con"
-int_cfg_raw_23x17 = namedtuple("int_cfg_raw_23x17", int_cfg_fields)
-if_cap_23x17 = namedtuple("if_cap_23x17", "int_flag int_cap")
+# именованные кортежи int_cfg_raw_23x17 и if_cap_23x17 создаются при первом обращении к ним (смотри __getattr__)
+_lazy_types = {"int_cfg_raw_23x17": int_cfg_fields, "if_cap_23x17": "int_flag int_cap"}
+
+
+def _lazy(name: str):
+    return lazy_namedtuple(globals(), name, _lazy_types[name])
+
+
+def __getattr__(name: str):
+    """Отложенное создание редко используемых именованных кортежей модуля"""
+    if name in _lazy_types:
+        return _lazy(name)
+    raise AttributeError(name)
+
+# диапазон индексов пар регистров, смотри MCP23x17._get_reg_address
+_reg_index_rng = range(11)
+# адреса пар регистров (порт A, порт B) по индексу, смотри MCP23x17._get_reg_address
+_reg_addr_8 = tuple((i, i + 0x10) for i in _reg_index_rng)           # IOCON.BANK = 1
+_reg_addr_16 = tuple((i << 1, (i << 1) + 1) for i in _reg_index_rng)  # IOCON.BANK = 0
+# бит SEQOP регистра IOCON. 1 - указатель адреса автоматически не увеличивается
+_IOCON_SEQOP = 0x20
+
+
+class IfCap23x17(MutableRecord):
+    """Изменяемый аналог if_cap_23x17 для параметра into метода get_if_cap"""
+    __slots__ = ("int_flag", "int_cap")
+
+
+class IntCfgRaw23x17(MutableRecord):
+    """Изменяемый аналог int_cfg_raw_23x17 для параметра into метода get_int_config"""
+    __slots__ = ("gp_int_en", "dev_val", "int_con")
+
 
 class MCP23x17(IOExpander):
     """MicroPython class for control 16-Bit I/O Expander with Serial Interface"""
 
-    def __init__(self, adapter: bus_service.BusAdapter, address: [int, Pin] = 0x27):
+    def __init__(self, adapter: bus_service.BusAdapter, address: [int, "Pin"] = 0x27):
         """eight_bit_mode - если Истина, то два порта (8-бит) ввода/вывода работают отдельно друг от друга.
         Иначе, два порта (8-бит) ввода/вывода объединяются в один (16 бит) порт ввода/вывода"""
         s0 = f"Invalid address value: 0x{address:x}!"
@@ -25,11 +52,19 @@ class MCP23x17(IOExpander):
         self._device = DeviceEx(adapter, address, big_byte_order=True)
         # после POR IOCON.BANK = 0 всегда!
         self._bank = self._get_addr_mode()  # то же самое, что и IOCON.BANK. После POR он в нуле!
+        # последнее записанное в IOCON значение
+        self._iocon = 0
+        # буферы для чтения регистров GPIO (snapshot)
+        self._snap_buf = bytearray(2)
+        _mv = memoryview(self._snap_buf)
+        self._snap_a, self._snap_b = _mv[:1], _mv[1:]
         # Регистры, связанные с каждым портом, разделены на разные банки.
         # Вывод INTA связан только с PORTA, а вывод INTB связан только с PORTB.
         # Последовательные операции чтения/записи отключены, указатель адреса автоматически не увеличивается.
         self._setup_iocon(bank=True, mirror=False, seqop=True)
         self._bank = self._get_addr_mode()
+        # _get_addr_mode записывает единицы в биты 0 и 1 IOCON, поэтому запоминается значение, прочитанное из IOCON
+        self._iocon = self._device.read_reg(0x05 if self._bank else 0x0A)[0]
 
     @micropython.native
     def _get_reg_address(self, index: int) -> (int, int):
@@ -51,59 +86,123 @@ class MCP23x17(IOExpander):
         :param index:
         :return:
         """
-        s0 = f"Invalid index value: {index}!"
-        check_value(index, range(11), s0)
-        if self._is_16_bit_mode():
-            x = index << 1
-            return x, x + 1
-        # 8 bit mode
-        x = index
-        return x, x + 0x10
-
-    def _read_reg_by_index(self, index: int) -> int:
-        """Чтение регистра по его индексу и текущему активному порту"""
-        addr = self._get_reg_address(index)[self.get_active_port()]    #
+        check_value_fmt(index, _reg_index_rng, "Invalid index value: {}!")
+        return (_reg_addr_8 if self._bank else _reg_addr_16)[index]
+
+    def _read_reg_by_index(self, index: int, n_port: int = None) -> int:
+        """Чтение регистра по его индексу и номеру порта. Если n_port is None, то используется текущий активный порт"""
+        if n_port is None:
+            n_port = self._active_port
+        else:
+            self._check_port_numb(n_port)
+        return self._read_reg(index, n_port)
+
+    def _read_reg(self, index: int, n_port: int) -> int:
+        """Чтение регистра по его индексу и проверенному(!) номеру порта"""
+        addr = (_reg_addr_8 if self._bank else _reg_addr_16)[index][n_port]
         bytes_count = 2 if self._is_16_bit_mode() else 1  # кол-во байт
         _dev = self._device
         res = _dev.read_reg(addr, bytes_count)  # bytes
         fmt = "H" if self._is_16_bit_mode() else "B"  # формат (H - unsigned short/B - unsigned byte)
         return _dev.unpack(fmt, res)[0]
 
-    def _write_reg_by_index(self, index: int, value: int):
-        """Запись в регистр по его индексу и текущему активному порту"""
-        addr = self._get_reg_address(index)[self.get_active_port()]  #
+    def _write_reg_by_index(self, index: int, value: int, n_port: int = None):
+        """Запись в регистр по его индексу и номеру порта. Если n_port is None, то используется текущий активный порт"""
+        if n_port is None:
+            n_port = self._active_port
+        else:
+            self._check_port_numb(n_port)
+        self._write_reg(index, value, n_port)
+
+    def _write_reg(self, index: int, value: int, n_port: int):
+        """Запись в регистр по его индексу и проверенному(!) номеру порта"""
+        addr = (_reg_addr_8 if self._bank else _reg_addr_16)[index][n_port]
         bytes_count = 2 if self._is_16_bit_mode() else 1  # кол-во байт
         self._device.write_reg(addr, value, bytes_count)
 
     # IOExpander
 
-    def get_port_value(self) -> int:
-        """Возвращает содержимое регистра порта ввода(DI))"""
-        return self._read_reg_by_index(9)
+    def read_port(self, n_port: int) -> int:
+        """Возвращает содержимое регистра порта ввода(DI)) n_port"""
+        return self._read_reg(9, self._check_port_numb(n_port))
 
-    def set_port_value(self, value: int):
-        """Устанавливает содержимое регистра порта вывода(DO)"""
-        self._write_reg_by_index(9, value)
+    def write_port(self, n_port: int, value: int):
+        """Устанавливает содержимое регистра порта вывода(DO) n_port"""
+        self._write_reg(9, value, self._check_port_numb(n_port))
+        self._state_out[n_port] = value
+
+    def snapshot(self, into, start: int = 0) -> int:
+        """Записывает значения входов портов A и B в into[start], into[start + 1].
+        При IOCON.BANK = 0 регистры GPIOA и GPIOB соседние (0x12, 0x13) и читаются одной транзакцией,
+        при IOCON.BANK = 1 (0x09, 0x19) - двумя."""
+        buf, _dev = self._snap_buf, self._device
+        if self._bank:
+            _dev.read_buf_from_mem(0x09, self._snap_a)
+            _dev.read_buf_from_mem(0x19, self._snap_b)
+        else:
+            _dev.read_buf_from_mem(0x12, buf)
+        into[start] = buf[0]
+        into[1 + start] = buf[1]
+        return 2 + start
 
     # PORT RAW
-    def set_port_config_raw(self, config: port_config_raw):
-        """Записывает в соотв. регистры настройки(!) текущего активного порта значения в 'сыром' виде."""
-        _wr_reg_by_index = self._write_reg_by_index
+    def config_port(self, n_port: int, config: port_config_raw):
+        """Записывает в соотв. регистры настройки(!) порта n_port значения в 'сыром' виде."""
+        self._check_port_numb(n_port)
+        _write_reg = self._write_reg
         if not config.direction_reg is None:
-            _wr_reg_by_index(index=0, value=config.direction_reg)
+            _write_reg(0, config.direction_reg, n_port)
         if not config.input_invert_reg is None:
-            _wr_reg_by_index(index=1, value=config.input_invert_reg)
+            _write_reg(1, config.input_invert_reg, n_port)
         if not config.pull_reg is None:
-            _wr_reg_by_index(index=6, value=config.pull_reg)
+            _write_reg(6, config.pull_reg, n_port)
+        self._update_state_cfg(n_port, config)
 
-    def get_port_config_raw(self) -> port_config_raw:
-        """Возвращает содержимое регистров настройки(!) текущего активного порта в сыром виде."""
-        _get_reg_by_index = self._read_reg_by_index
-        _dir = _get_reg_by_index(0)
-        _inv = _get_reg_by_index(1)
-        _pull = _get_reg_by_index(6)
+    def read_port_config(self, n_port: int, into: PortConfigRaw = None) -> [port_config_raw, PortConfigRaw]:
+        """Возвращает содержимое регистров настройки(!) порта n_port в сыром виде.
+        Если into не None, то значения записываются в него и возвращается into."""
+        self._check_port_numb(n_port)
+        _read_reg = self._read_reg
+        _dir = _read_reg(0, n_port)
+        _inv = _read_reg(1, n_port)
+        _pull = _read_reg(6, n_port)
         #
-        return port_config_raw(direction_reg=_dir, input_invert_reg=_inv, pull_reg=_pull)
+        if into is None:
+            return port_config_raw(direction_reg=_dir, input_invert_reg=_inv, pull_reg=_pull)
+        into.direction_reg, into.input_invert_reg, into.pull_reg = _dir, _inv, _pull
+        return into
+
+    # RESET DETECTION
+    fingerprint_size = 1
+    fingerprint_cost = 4    # адрес + IOCON, адрес + IOCON
+
+    def read_port_latch(self, n_port: int) -> int:
+        """Возвращает содержимое регистра OLAT порта n_port"""
+        return self._read_reg(0x0A, self._check_port_numb(n_port))
+
+    def read_fingerprint(self, buf) -> bool:
+        """Читает IOCON по его адресу при текущей адресации регистров в buf. После сброса IOCON = 0 и BANK = 0,
+        поэтому по адресу 0x05 читается другой регистр, а по адресу 0x0A - ноль.
+        Возвращает Ложь, если прочитанное значение не равно последнему записанному в IOCON.
+        Если последнее записанное в IOCON значение равно 0 (как после сброса), сброс обнаружить нельзя!"""
+        self._device.read_buf_from_mem(0x05 if self._bank else 0x0A, buf)
+        # бит 0 IOCON не реализован и читается как 0
+        return buf[0] == self._iocon & 0xFE
+
+    def _detect_bank(self) -> bool:
+        """Определяет IOCON.BANK микросхемы без записи в нее. При BANK = 1 IOCON доступен по адресам 0x05 и 0x15
+        и его бит 7 (BANK) равен 1. При BANK = 0 по этим адресам регистры GPINTENB и OLATB."""
+        _read_reg = self._device.read_reg
+        val = _read_reg(0x05)[0]
+        return 0x80 == val & 0x81 and val == _read_reg(0x15)[0]
+
+    def restore_state(self):
+        """Записывает копию состояния в микросхему после ее сброса: IOCON, затем значения выходов и настройку
+        портов. IOCON записывается по его адресу при адресации регистров, определенной по микросхеме
+        (после сброса BANK = 0), чтобы не записать его значение в другой регистр."""
+        self._bank = self._detect_bank()
+        self._write_iocon(self._iocon)
+        super().restore_state()
 
     # END IOExpander
 
@@ -133,23 +232,30 @@ class MCP23x17(IOExpander):
 
     # Уникальные(!) для этой микросхемы, методы
 
-    def get_output_latch(self) -> int:
+    # Параметр n_port - номер порта. Если n_port is None, то используется текущий активный порт.
+
+    def get_output_latch(self, n_port: int = None) -> int:
         """Возвращает значение OLAT.
         Регистр OLAT обеспечивает доступ к вывода"""
-        return self._read_reg_by_index(0x0A)     # 0x0A - OLAT
+        return self._read_reg_by_index(0x0A, n_port)     # 0x0A - OLAT
 
-    def set_output_latch(self, value: int):
+    def set_output_latch(self, value: int, n_port: int = None):
         """Записывает значение в OLAT"""
-        self._write_reg_by_index(0x0A, value)  # 0x0A - OLAT
+        self._write_reg_by_index(0x0A, value, n_port)  # 0x0A - OLAT
+        self._state_out[self._active_port if n_port is None else n_port] = value
 
-    def get_if_cap(self) -> if_cap_23x17:
-        """Возвращает содержимое регистров: INTERRUPT FLAG REGISTER, """
+    def get_if_cap(self, into: IfCap23x17 = None, n_port: int = None) -> ["if_cap_23x17", IfCap23x17]:
+        """Возвращает содержимое регистров: INTERRUPT FLAG REGISTER, INTCAP.
+        Если into не None, то значения записываются в него и возвращается into."""
         _get_reg_by_index = self._read_reg_by_index
         #
-        _int_f = _get_reg_by_index(7)     # INTERRUPT FLAG REGISTER
-        _int_cap = _get_reg_by_index(8)   # INTCAP (INTERRUPT CAPTURED VALUE FOR PORT REGISTER)
+        _int_f = _get_reg_by_index(7, n_port)     # INTERRUPT FLAG REGISTER
+        _int_cap = _get_reg_by_index(8, n_port)   # INTCAP (INTERRUPT CAPTURED VALUE FOR PORT REGISTER)
         #
-        return if_cap_23x17(int_flag=_int_f, int_cap=_int_cap)
+        if into is None:
+            return _lazy("if_cap_23x17")(int_flag=_int_f, int_cap=_int_cap)
+        into.int_flag, into.int_cap = _int_f, _int_cap
+        return into
 
     def _setup_iocon(self, bank: bool, mirror: bool = False,
                      seqop: bool = False, disslw: bool = False,
@@ -157,35 +263,66 @@ class MCP23x17(IOExpander):
         """Setup IOCON register. Биты  HAEN, ODR, INTPOL обнуляю всегда!
         Вызывать только после(!) вызова _get_addr_mode()."""
         val = (bank << 7) | (mirror << 6) | (seqop << 5) | (disslw << 4) | (haen << 3) | (odr << 2) | (intpol << 1)
-        _dev = self._device
-        if not self._bank and bank:		# переход из 0 -> 1 (плоская адресация -> раздельная адресация)
-            _dev.write_reg(0x0A, value=val, bytes_count=1)
-            # self._write_reg(0x0A, value=(val << 8) | val, bytes_count=2)
-            # self._write_reg(0x0B, value=val)
-        if not bank and self._bank:		# переход из 1 -> 0 (раздельная адресация -> плоская адресация)
-            _dev.write_reg(0x05, value=val, bytes_count=1)
-            # self._write_reg(0x15, value=val)
-        self._bank = bank
-
-    def set_int_config(self, gp_int_en: [int, None], int_con: [int, None], def_val: [int, None]):
-        """Настройка условий возникновения аппаратных прерывания текущего активного порта.
+        self._write_iocon(val)
+
+    def _write_iocon(self, val: int):
+        """Записывает val в IOCON по его адресу при текущей адресации регистров и запоминает значение"""
+        # при раздельной адресации (BANK = 1) IOCON по адресу 0x05, при совместной (BANK = 0) по адресу 0x0A.
+        # переходы 0 -> 1 и 1 -> 0 выполняются записью по адресу текущей адресации
+        self._device.write_reg(0x05 if self._bank else 0x0A, value=val, bytes_count=1)
+        self._iocon = val
+        self._bank = bool(val & 0x80)
+
+    def write_stream(self, buf, n_port: int = None):
+        """Записывает в регистр GPIO порта n_port (или текущего активного порта) последовательность значений из buf (bytes, bytearray,
+        memoryview) за одну транзакцию шины. При IOCON.SEQOP = 1 указатель адреса не увеличивается, поэтому каждый
+        принятый байт становится новым состоянием выходов: получается 'ногодрыг' со скоростью шины.
+        Если SEQOP = 0, то на время записи он устанавливается в 1, а затем восстанавливается.
+        В 16-ти битном режиме (IOCON.BANK = 0) указатель адреса переключается между регистрами пары GPIOA/GPIOB,
+        поэтому buf содержит пары байт: значение порта A, значение порта B."""
+        if n_port is None:
+            n_port = self._active_port
+        else:
+            self._check_port_numb(n_port)
+        iocon = self._iocon
+        if iocon & _IOCON_SEQOP:
+            self._device.write_buf_to_mem(self._get_reg_address(9)[n_port], buf)
+        else:
+            self._write_iocon(iocon | _IOCON_SEQOP)
+            try:
+                self._device.write_buf_to_mem(self._get_reg_address(9)[n_port], buf)
+            finally:
+                # SEQOP восстанавливается и при ошибке шины, иначе IOCON не совпадет с _iocon
+                self._write_iocon(iocon)
+        n = len(buf)
+        if n:
+            # на выходах остается последнее значение (в 16-ти битном режиме - последняя пара байт)
+            self._state_out[n_port] = buf[n - 1] if self._bank or n < 2 else (buf[n - 2] << 8) | buf[n - 1]
+
+    def set_int_config(self, gp_int_en: [int, None], int_con: [int, None], def_val: [int, None],
+                       n_port: int = None):
+        """Настройка условий возникновения аппаратных прерывания порта n_port (или текущего активного порта).
         gp_int_en - значение для регистра GPINTEN; def_val - значение для регистра DEFVAL; int_con - значение для регистра INTCON;"""
         _wr_reg_by_index = self._write_reg_by_index
         #
         if not gp_int_en is None:
-            _wr_reg_by_index(index=2, value=gp_int_en)
+            _wr_reg_by_index(2, gp_int_en, n_port)
         if not int_con is None:
-            _wr_reg_by_index(index=4, value=int_con)
+            _wr_reg_by_index(4, int_con, n_port)
         if not def_val is None:
-            _wr_reg_by_index(index=3, value=def_val)
+            _wr_reg_by_index(3, def_val, n_port)
 
 
-    def get_int_config(self) -> int_cfg_raw_23x17:
-        """Возвращает содержимое регистров настройки прерываний текущего активного порта."""
+    def get_int_config(self, into: IntCfgRaw23x17 = None, n_port: int = None) -> ["int_cfg_raw_23x17", IntCfgRaw23x17]:
+        """Возвращает содержимое регистров настройки прерываний порта n_port (или текущего активного порта).
+        Если into не None, то значения записываются в него и возвращается into."""
         #
         _get_reg_by_index = self._read_reg_by_index
-        _int_en = _get_reg_by_index(2)
-        _def_val = _get_reg_by_index(3)
-        _int_con = _get_reg_by_index(4)
+        _int_en = _get_reg_by_index(2, n_port)
+        _def_val = _get_reg_by_index(3, n_port)
+        _int_con = _get_reg_by_index(4, n_port)
         #
-        return int_cfg_raw_23x17(gp_int_en=_int_en, dev_val=_def_val, int_con=_int_con)
+        if into is None:
+            return _lazy("int_cfg_raw_23x17")(gp_int_en=_int_en, dev_val=_def_val, int_con=_int_con)
+        into.gp_int_en, into.dev_val, into.int_con = _int_en, _def_val, _int_con
+        return into
@@ -3,7 +3,8 @@
 # Copyright (c) 2023 Roman Shevchik
 from sensor_pack_2 import bus_service
 from sensor_pack_2.base_sensor import DeviceEx, check_value
-from sensor_pack_2.ioexpander import IOExpander, port_config_raw
+from sensor_pack_2.ioexpander import IOExpander, port_config_raw, PortConfigRaw
+from sensor_pack_2.bitops import extract_bits, merge_bits
 
 
 # Please read this before use!: https://www.nxp.com/part/PCF8574T
@@ -13,6 +14,8 @@ from sensor_pack_2.ioexpander import IOExpander, port_config_raw
 # The devices consist of eight quasi-bidirectional ports.
 class PCF8574(IOExpander):
     """Provides general-purpose remote I/O expansion via the two-wire bidirectional I2C-bus."""
+    # регистров настройки нет: входы - выводы с 1 в выходном регистре (квазидвунаправленные выводы)
+    has_config_regs = False
     def __init__(self, adapter: bus_service.BusAdapter, address: int = 0x20):
         s0 = f"Invalid address value: 0x{address:x}!"
         if address < 0x38:  # PCF8574
@@ -22,28 +25,84 @@ class PCF8574(IOExpander):
         #
         super().__init__(port_count=1, port_width=8)
         self._device = DeviceEx(adapter, address, True)
+        # буферы для обмена без адреса регистра (у микросхемы нет регистров), создаются один раз
+        self._rd_buf = bytearray(1)
+        self._wr_buf = bytearray(1)
         #
         self._setup()
 
     # PORT
-    def get_port_value(self) -> int:
-        """считывает значение на линиях P0..P7."""
-        _dev = self._device
-        return _dev.read_reg(reg_addr=_dev.address, bytes_count=1)[0]
+    def read_port(self, n_port: int) -> int:
+        """считывает значение на линиях P0..P7. n_port - всегда 0.
+        Чтение без записи байта 'адреса регистра', который микросхема приняла бы за запись в порт."""
+        self._check_port_numb(n_port)
+        buf = self._rd_buf
+        self._device.read_to_buf(buf)
+        return buf[0]
 
-    def set_port_value(self, value: int):
-        """записывает значения на линии P0..P7."""
-        _dev = self._device
-        _dev.write_reg(reg_addr=_dev.address, value=value, bytes_count=1)
+    def write_port(self, n_port: int, value: int):
+        """записывает значения на линии P0..P7. n_port - всегда 0."""
+        self._check_port_numb(n_port)
+        buf = self._wr_buf
+        buf[0] = value
+        self._device.write(buf)
+
+    def snapshot(self, into, start: int = 0) -> int:
+        """Записывает значение на линиях P0..P7 в into[start]. Одна транзакция чтения"""
+        buf = self._rd_buf
+        self._device.read_to_buf(buf)
+        into[start] = buf[0]
+        return 1 + start
+
+    # STREAM
+    def write_stream(self, buf):
+        """Записывает в порт P0..P7 последовательность значений из buf (bytes, bytearray, memoryview) за одну
+        транзакцию шины. Микросхема защелкивает каждый принятый байт, поэтому на выходах по очереди появляются все
+        значения buf, каждое длительностью в один байт шины (9 тактов SCL, 22.5 мкс при 400 кГц).
+        Буфер заполняется заранее, например функциями lcd_bytes_to_stream или shift_out_to_stream."""
+        self._device.write(buf)
+        if len(buf):
+            # на выходах остается последнее значение
+            self._wr_buf[0] = buf[len(buf) - 1]
 
     # PORT RAW
-    def set_port_config_raw(self, config: port_config_raw):
-        """Записывает в соотв. регистры настройки(!) текущего активного порта значения в 'сыром' виде."""
-        self.set_port_value(config.direction_reg)
+    def config_port(self, n_port: int, config: port_config_raw):
+        """Записывает в соотв. регистры настройки(!) порта n_port значения в 'сыром' виде.
+        Регистров настройки нет, direction_reg записывается в порт."""
+        self.write_port(n_port, config.direction_reg)
+
+    def read_port_config(self, n_port: int, into: PortConfigRaw = None) -> [port_config_raw, PortConfigRaw]:
+        """Возвращает содержимое регистров настройки(!) порта n_port в сыром виде.
+        Если into не None, то значения записываются в него и возвращается into."""
+        _dir = self.read_port(n_port)
+        if into is None:
+            return port_config_raw(direction_reg=_dir, input_invert_reg=None, pull_reg=None)
+        into.direction_reg, into.input_invert_reg, into.pull_reg = _dir, None, None
+        return into
+
+    # RESET DETECTION
+    fingerprint_size = 1
+    fingerprint_cost = 2    # адрес + порт
+
+    def read_port_latch(self, n_port: int) -> int:
+        """Возвращает последнее записанное в порт значение. n_port - всегда 0.
+        Микросхема не позволяет прочитать выходной регистр, поэтому его копия хранится в драйвере."""
+        self._check_port_numb(n_port)
+        return self._wr_buf[0]
 
-    def get_port_config_raw(self) -> port_config_raw:
-        """Возвращает содержимое регистров настройки(!) текущего активного порта в сыром виде."""
-        return port_config_raw(direction_reg=self.get_port_value(), input_invert_reg=None, pull_reg=None)
+    def save_state(self):
+        """Копия состояния - последнее записанное в порт значение, чтения из микросхемы не требуется"""
+        pass
+
+    def restore_state(self):
+        """Записывает в порт последнее записанное значение"""
+        self._device.write(self._wr_buf)
+
+    def read_fingerprint(self, buf) -> bool:
+        """Читает значение порта в buf. Выводы, в которые записан 0 (выходы с низким уровнем), должны читаться
+        как 0. После сброса в выходном регистре 0xFF. Возвращает Ложь, если это не так."""
+        self._device.read_to_buf(buf)
+        return not buf[0] & (0xFF ^ self._wr_buf[0])
 
     def _setup(self, value: int = 0xFF):
         """Настройка портов на ввод/вывод. По умолчанию выводы P0..P7 настраиваются как входы!
@@ -55,4 +114,71 @@ class PCF8574(IOExpander):
               состояние, а кнопку подключайте между выводом порта и ЗЕМЛЕЙ(VSS)!!!
             * если вы подключаете к выводу порта P0..P7 нагрузку, то подавать напряжение на нее нужно ЗАПИСЬЮ в
               соответствующий бит НУЛЯ, а нагрузку подключайте между +Питание(VDD) и выводом порта P0..P7!!!"""
-        self.set_port_value(value)
+        self.write_port(0, value)
+
+
+# Построение буферов для PCF8574.write_stream.
+# Выводы PCF8574 на типовой плате-переходнике ЖКИ HD44780: P0 - RS, P1 - RW, P2 - E, P3 - подсветка, P4..P7 - D4..D7
+LCD_RS = 0x01
+LCD_RW = 0x02
+LCD_E = 0x04
+LCD_BL = 0x08
+
+
+def lcd_nibble_to_stream(dst, start: int, nibble: int, ctrl: int) -> int:
+    """Записывает в dst, начиная с индекса start, два состояния порта для передачи полубайта nibble в HD44780:
+    с E = 1 и с E = 0 (ЖКИ защелкивает данные по спаду E). ctrl - биты LCD_RS, LCD_BL.
+    Возвращает индекс, следующий за последним записанным."""
+    val = (nibble << 4) | ctrl
+    dst[start] = val | LCD_E
+    dst[1 + start] = val
+    return 2 + start
+
+
+def lcd_bytes_to_stream(dst, start: int, data, rs: bool, backlight: bool = True) -> int:
+    """Записывает в dst, начиная с индекса start, состояния порта для передачи байт data в HD44780
+    в 4-битном режиме (по 4 байта на байт data). rs - Ложь для команд, Истина для данных.
+    Возвращает индекс, следующий за последним записанным. Память не выделяется."""
+    ctrl = (LCD_RS if rs else 0) | (LCD_BL if backlight else 0)
+    for b in data:
+        start = lcd_nibble_to_stream(dst, start, b >> 4, ctrl)
+        start = lcd_nibble_to_stream(dst, start, b & 0x0F, ctrl)
+    return start
+
+
+def make_lcd_stream(data, rs: bool, backlight: bool = True) -> bytearray:
+    """Возвращает буфер для передачи байт data в HD44780 в 4-битном режиме"""
+    buf = bytearray(4 * len(data))
+    lcd_bytes_to_stream(buf, 0, data, rs, backlight)
+    return buf
+
+
+def shift_out_to_stream(dst, start: int, data, data_bit: int, clock_bit: int, latch_bit: int = -1,
+                        rest: int = 0, msb_first: bool = True) -> int:
+    """Записывает в dst, начиная с индекса start, состояния порта для последовательной передачи байт data в
+    сдвиговый регистр (74HC595 и т. п.): по два состояния на бит (данные при CLK = 0, затем фронт CLK).
+    Если latch_bit >= 0, в конце добавляется импульс защелки (еще два состояния).
+    data_bit, clock_bit, latch_bit - номера выводов порта; rest - значение остальных выводов порта.
+    Возвращает индекс, следующий за последним записанным. Память не выделяется."""
+    d_mask, c_mask = 1 << data_bit, 1 << clock_bit
+    base = merge_bits(rest, 0, d_mask | c_mask | ((1 << latch_bit) if latch_bit >= 0 else 0)) & 0xFF
+    for b in data:
+        for i in range(8):
+            bit = extract_bits(b, 7 - i if msb_first else i, 1)
+            val = base | (d_mask if bit else 0)
+            dst[start] = val
+            dst[1 + start] = val | c_mask
+            start += 2
+    if latch_bit >= 0:
+        dst[start] = base | (1 << latch_bit)
+        dst[1 + start] = base
+        start += 2
+    return start
+
+
+def make_shift_out_stream(data, data_bit: int, clock_bit: int, latch_bit: int = -1, rest: int = 0,
+                          msb_first: bool = True) -> bytearray:
+    """Возвращает буфер для последовательной передачи байт data в сдвиговый регистр (смотри shift_out_to_stream)"""
+    buf = bytearray(16 * len(data) + (2 if latch_bit >= 0 else 0))
+    shift_out_to_stream(buf, 0, data, data_bit, clock_bit, latch_bit, rest, msb_first)
+    return buf
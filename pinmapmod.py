@@ -0,0 +1,159 @@
+# MicroPython
+# MIT license
+"""Декларативное описание сигналов на выводах расширителей ввода-вывода (карта выводов).
+Описание компилируется один раз в слова регистров настройки портов и маски сигналов.
+Declarative pin map compiled into per-chip, per-port register words and signal mask tables."""
+
+from array import array
+from sensor_pack_2.ioexpander import IOExpander, port_config_raw
+from sensor_pack_2.bitops import bit_mask, merge_bits
+
+# порядок полей описания сигнала в виде списка/кортежа
+_fields = ("chip", "port", "bit", "dir", "invert", "pull", "init")
+_defaults = {"dir": "in", "invert": False, "pull": False, "init": False}
+
+
+def _parse(desc) -> dict:
+    """Приводит описание сигнала (словарь или список/кортеж полей _fields) к словарю"""
+    if isinstance(desc, dict):
+        d = dict(_defaults)
+        d.update(desc)
+        return d
+    d = dict(_defaults)
+    d.update(zip(_fields, desc))
+    return d
+
+
+class Signal:
+    """Именованный сигнал карты выводов. Доступ к значению по заранее вычисленным маскам"""
+    __slots__ = ("_map", "_slot", "_mask", "_invert")
+
+    def __init__(self, pin_map: "PinMap", slot: int, mask: int, invert: int):
+        self._map = pin_map
+        self._slot = slot
+        self._mask = mask
+        self._invert = invert
+
+    def value(self, val: [bool, None] = None) -> [bool, None]:
+        """Возвращает значение сигнала (val is None) или устанавливает его"""
+        if val is None:
+            return self._map._read(self._slot, self._mask, self._invert)
+        self._map._write(self._slot, self._mask, self._invert, val)
+
+
+class PinMap:
+    """Карта выводов. Описание: словарь {имя сигнала: описание}, где описание - словарь с ключами
+    chip, port, bit, dir ('in' или 'out'), invert, pull, init или список/кортеж значений в том же порядке.
+    chip - ключ словаря chips с экземплярами расширителей ввода-вывода.
+    Для каждого используемого порта вычисляются слова регистров направления, инверсии и подтяжки.
+    Невключенные в описание выводы настраиваются на вход. Инверсия входов выполняется расширителем
+    (программно, если у него нет регистров настройки, как у PCF8574), инверсия выходов - программно (XOR с маской). Значения выходов хранятся в кэше, поэтому запись сигнала
+    не требует чтения порта."""
+
+    def __init__(self, description: dict, chips: dict):
+        """description - описание сигналов; chips - словарь {имя: IOExpander}"""
+        # порты, к которым подключены сигналы: индекс (slot) -> (имя расширителя, номер порта)
+        slots = {}
+        self._slot_exp = []
+        self._slot_port = []
+        signals = {}
+        for name, desc in description.items():
+            d = _parse(desc)
+            exp: IOExpander = chips[d["chip"]]
+            n_port = exp._check_port_numb(d["port"])
+            bit = exp._check_pin_numb(d["bit"])
+            if d["dir"] not in ("in", "out"):
+                raise ValueError(f"Неверное направление сигнала {name}: {d['dir']}")
+            key = (d["chip"], n_port)
+            if key not in slots:
+                slots[key] = len(self._slot_exp)
+                self._slot_exp.append(exp)
+                self._slot_port.append(n_port)
+            signals[name] = (slots[key], 1 << bit, d)
+        count = len(self._slot_exp)
+        # слова регистров настройки портов и кэш выходов
+        self._dir = array("H", (0 for _ in range(count)))
+        self._inv = array("H", (0 for _ in range(count)))
+        self._pull = array("H", (0 for _ in range(count)))
+        self._latch = array("H", (0 for _ in range(count)))
+        used = array("H", (0 for _ in range(count)))
+        self._signals = {}
+        for name, (slot, mask, d) in signals.items():
+            if used[slot] & mask:
+                raise ValueError(f"Вывод сигнала {name} уже занят!")
+            used[slot] |= mask
+            invert = mask if d["invert"] else 0
+            if "out" == d["dir"]:
+                # выходы инвертируются программно
+                self._dir[slot] |= mask
+                self._latch[slot] |= (mask if d["init"] else 0) ^ invert
+                self._signals[name] = Signal(self, slot, mask, invert)
+            elif self._slot_exp[slot].has_config_regs:
+                self._inv[slot] |= invert
+                self._pull[slot] |= mask if d["pull"] else 0
+                self._signals[name] = Signal(self, slot, mask, 0)
+            else:
+                # инверсия входа программно
+                self._signals[name] = Signal(self, slot, mask, invert)
+        for slot in range(count):
+            port_mask = bit_mask(0, self._slot_exp[slot].get_port_info().width)
+            # в _dir были собраны выходы. Все остальные выводы порта - входы (1 в регистре направления)
+            self._dir[slot] ^= port_mask
+            # в выходной регистр по выводам-входам пишется 1 (квазидвунаправленные выводы PCF8574)
+            self._latch[slot] |= self._dir[slot]
+
+    def apply(self) -> int:
+        """Настраивает порты расширителей: для каждого порта одна запись значений выходов и одна запись
+        регистров настройки. Значения выходов записываются до переключения выводов на выход.
+        У PCF8574 нет регистров настройки, его входы - выводы с 1 в выходном регистре, поэтому для него
+        выполняется только запись значений выходов. Возвращает кол-во настроенных портов."""
+        for slot in range(len(self._slot_exp)):
+            exp, n_port = self._slot_exp[slot], self._slot_port[slot]
+            exp.write_port(n_port, self._latch[slot])
+            if not exp.has_config_regs:
+                continue
+            exp.config_port(n_port, port_config_raw(direction_reg=self._dir[slot], input_invert_reg=self._inv[slot],
+                                                    pull_reg=self._pull[slot]))
+        return len(self._slot_exp)
+
+    def signal(self, name: str) -> Signal:
+        """Возвращает сигнал по имени"""
+        return self._signals[name]
+
+    def __getitem__(self, name: str) -> bool:
+        return self._signals[name].value()
+
+    def __setitem__(self, name: str, val: bool):
+        self._signals[name].value(val)
+
+    def names(self) -> tuple:
+        return tuple(self._signals)
+
+    def get_port_words(self, slot: int) -> tuple:
+        """Возвращает (расширитель, номер порта, направление, инверсия, подтяжка) порта с индексом slot"""
+        return (self._slot_exp[slot], self._slot_port[slot], self._dir[slot], self._inv[slot], self._pull[slot])
+
+    def _read(self, slot: int, mask: int, invert: int) -> bool:
+        return 0 != (self._slot_exp[slot].read_port(self._slot_port[slot]) ^ invert) & mask
+
+    def _write(self, slot: int, mask: int, invert: int, val: bool):
+        latch = self._latch
+        new = merge_bits(latch[slot], (mask if val else 0) ^ invert, mask)
+        if new == latch[slot]:
+            return
+        latch[slot] = new
+        self._slot_exp[slot].write_port(self._slot_port[slot], new)
+
+    def write_port_signals(self, slot: int, mask: int, value: int):
+        """Записывает биты value по маске mask порта с индексом slot одной записью (несколько сигналов сразу).
+        Программная инверсия выходов не выполняется!"""
+        latch = self._latch
+        latch[slot] = merge_bits(latch[slot], value, mask)
+        self._slot_exp[slot].write_port(self._slot_port[slot], latch[slot])
+
+
+def load_pin_map(file_name: str, chips: dict) -> PinMap:
+    """Загружает описание сигналов из JSON файла и возвращает PinMap"""
+    import json
+    with open(file_name) as f:
+        return PinMap(json.load(f), chips)
@@ -0,0 +1,342 @@
+# MicroPython
+# MIT license
+"""Фильтры передискретизации (oversampling) и децимации для потока отсчетов АЦП.
+Вычисления целочисленные и выполняются над блоками отсчетов (array), а не над отдельными значениями.
+Oversampling and decimation filters for ADC sample streams."""
+
+import math
+from array import array
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+
+def _log2_int(value: int) -> int:
+    """Возвращает log2(value) для value, равного степени двойки. Иначе выбрасывает исключение."""
+    if value < 1 or value & (value - 1):
+        raise ValueError(f"Значение должно быть степенью двойки: {value}")
+    n = 0
+    while value > 1:
+        value >>= 1
+        n += 1
+    return n
+
+
+# Ядра методов process фильтров. В MicroPython компилируются в машинный код (@micropython.native),
+# на 'большом' Python - тот же код без компиляции.
+if micropython is not None:
+    @micropython.native
+    def _boxcar(flt, src, dst, count: int) -> int:
+        n, shift = flt._n, flt._shift
+        acc, cnt, out = flt._acc, flt._cnt, 0
+        for i in range(count):
+            acc += src[i]
+            cnt += 1
+            if cnt == n:
+                dst[out] = acc >> shift
+                out += 1
+                acc = 0
+                cnt = 0
+        flt._acc, flt._cnt = acc, cnt
+        return out
+
+    @micropython.native
+    def _cic(flt, src, dst, count: int) -> int:
+        integ, combs = flt._integrators, flt._combs
+        order, ratio, shift = flt._order, flt._ratio, flt._shift
+        mask, sign = flt._reg_mask, flt._sign_bit
+        cnt, out = flt._cnt, 0
+        for i in range(count):
+            val = src[i]
+            for k in range(order):
+                val = (val + integ[k]) & mask
+                integ[k] = val
+            cnt += 1
+            if cnt == ratio:
+                cnt = 0
+                for k in range(order):
+                    prev = combs[k]
+                    combs[k] = val
+                    val = (val - prev) & mask
+                if val & sign:
+                    val -= mask + 1
+                dst[out] = val >> shift
+                out += 1
+        flt._cnt = cnt
+        return out
+
+    @micropython.native
+    def _ema(flt, src, dst, count: int) -> int:
+        k, shift = flt._k, flt._shift
+        state = flt._state
+        if state is None:
+            state = src[0] << k   # начальное значение равно первому отсчету
+        for i in range(count):
+            state += src[i] - (state >> k)
+            dst[i] = state >> shift
+        flt._state = state
+        return count
+else:
+    def _boxcar(flt, src, dst, count: int) -> int:
+        n, shift = flt._n, flt._shift
+        acc, cnt, out = flt._acc, flt._cnt, 0
+        for i in range(count):
+            acc += src[i]
+            cnt += 1
+            if cnt == n:
+                dst[out] = acc >> shift
+                out += 1
+                acc = 0
+                cnt = 0
+        flt._acc, flt._cnt = acc, cnt
+        return out
+
+    def _cic(flt, src, dst, count: int) -> int:
+        integ, combs = flt._integrators, flt._combs
+        order, ratio, shift = flt._order, flt._ratio, flt._shift
+        mask, sign = flt._reg_mask, flt._sign_bit
+        cnt, out = flt._cnt, 0
+        for i in range(count):
+            val = src[i]
+            for k in range(order):
+                val = (val + integ[k]) & mask
+                integ[k] = val
+            cnt += 1
+            if cnt == ratio:
+                cnt = 0
+                for k in range(order):
+                    prev = combs[k]
+                    combs[k] = val
+                    val = (val - prev) & mask
+                if val & sign:
+                    val -= mask + 1
+                dst[out] = val >> shift
+                out += 1
+        flt._cnt = cnt
+        return out
+
+    def _ema(flt, src, dst, count: int) -> int:
+        k, shift = flt._k, flt._shift
+        state = flt._state
+        if state is None:
+            state = src[0] << k   # начальное значение равно первому отсчету
+        for i in range(count):
+            state += src[i] - (state >> k)
+            dst[i] = state >> shift
+        flt._state = state
+        return count
+
+
+class BlockFilter:
+    """Фильтр блока целочисленных отсчетов. Базовый класс.
+    Фильтр хранит свое состояние между вызовами process, поэтому поток отсчетов можно обрабатывать
+    блоками произвольной длины."""
+
+    def process(self, src, dst, count: int = None) -> int:
+        """Обрабатывает count (если None, то len(src)) отсчетов из src и записывает результат в dst.
+        Возвращает количество записанных в dst отсчетов.
+        src и dst могут быть одним и тем же буфером, так как выходных отсчетов не больше, чем входных!
+        Для переопределения в классе-наследнике!"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Сбрасывает состояние фильтра. Для переопределения в классе-наследнике!"""
+        raise NotImplementedError
+
+    @property
+    def decimation(self) -> int:
+        """Коэффициент децимации. Один выходной отсчет на decimation входных."""
+        return 1
+
+    @property
+    def resolution_gain(self) -> float:
+        """Эффективный прирост разрешения в битах (для белого шума на входе).
+        Для переопределения в классе-наследнике!"""
+        raise NotImplementedError
+
+    @property
+    def extra_bits(self) -> int:
+        """Количество дополнительных младших бит в выходном отсчете по сравнению с входным."""
+        return self._extra_bits
+
+    def _check_extra_bits(self, extra_bits: [int, None], growth: int) -> int:
+        """Проверяет кол-во дополнительных бит. Если extra_bits is None, возвращает целую часть resolution_gain."""
+        if extra_bits is None:
+            return int(self.resolution_gain)
+        if not 0 <= extra_bits <= growth:
+            raise ValueError(f"Неверное кол-во дополнительных бит: {extra_bits}. Допустимо: 0..{growth}")
+        return extra_bits
+
+
+class BoxcarFilter(BlockFilter):
+    """Усреднение по N отсчетам без перекрытия (boxcar) с децимацией в N раз.
+    Выходной отсчет: сумма N отсчетов, сдвинутая вправо так, чтобы осталось extra_bits дополнительных бит."""
+
+    def __init__(self, n: int, extra_bits: int = None):
+        """n - кол-во усредняемых отсчетов, степень двойки;
+        extra_bits - кол-во дополнительных бит в выходном отсчете. Если None, то int(resolution_gain)."""
+        self._growth = _log2_int(n)
+        self._n = n
+        self._extra_bits = self._check_extra_bits(extra_bits, self._growth)
+        self._shift = self._growth - self._extra_bits
+        self._acc = 0
+        self._cnt = 0
+
+    def reset(self):
+        self._acc = 0
+        self._cnt = 0
+
+    @property
+    def decimation(self) -> int:
+        return self._n
+
+    @property
+    def resolution_gain(self) -> float:
+        return 0.5 * self._growth
+
+    def process(self, src, dst, count: int = None) -> int:
+        _count = len(src) if count is None else count
+        return _boxcar(self, src, dst, _count)
+
+
+class CICDecimator(BlockFilter):
+    """Фильтр CIC (cascaded integrator-comb) порядка order с децимацией в ratio раз и задержкой гребенки 1.
+    Интеграторы работают на входной частоте, гребенки (comb) - на выходной. Прирост разрядности order * log2(ratio).
+    Интеграторы и гребенки - регистры разрядностью B = in_bits + order * log2(ratio) + 1 (бит знака): вычисления
+    по модулю 2 ** B, поэтому интеграторы не растут на бесконечном потоке отсчетов, а выходной отсчет точный.
+    Чтобы в MicroPython обработка отсчетов не выделяла память (small int, 31 бит), B должно быть не более 29."""
+
+    def __init__(self, ratio: int, order: int = 3, extra_bits: int = None, in_bits: int = 16):
+        """ratio - коэффициент децимации, степень двойки;
+        order - порядок фильтра (кол-во пар интегратор-гребенка) 1..5;
+        extra_bits - кол-во дополнительных бит в выходном отсчете. Если None, то int(resolution_gain);
+        in_bits - разрядность входных отсчетов (беззнаковых или знаковых) 1..32."""
+        if not 1 <= order <= 5:
+            raise ValueError(f"Неверный порядок CIC фильтра: {order}")
+        self._ratio = ratio
+        self._order = order
+        self._log2_ratio = _log2_int(ratio)
+        growth = order * self._log2_ratio
+        self._extra_bits = self._check_extra_bits(extra_bits, growth)
+        self._shift = growth - self._extra_bits
+        if not 1 <= in_bits <= 32:
+            raise ValueError(f"Неверная разрядность входных отсчетов: {in_bits}")
+        reg_bits = in_bits + growth + 1
+        self._reg_mask = (1 << reg_bits) - 1
+        self._sign_bit = 1 << (reg_bits - 1)
+        self._integrators = [0 for _ in range(order)]
+        self._combs = [0 for _ in range(order)]
+        self._cnt = 0
+
+    def reset(self):
+        for i in range(self._order):
+            self._integrators[i] = 0
+            self._combs[i] = 0
+        self._cnt = 0
+
+    @property
+    def decimation(self) -> int:
+        return self._ratio
+
+    @property
+    def resolution_gain(self) -> float:
+        return 0.5 * self._log2_ratio
+
+    def process(self, src, dst, count: int = None) -> int:
+        _count = len(src) if count is None else count
+        return _cic(self, src, dst, _count)
+
+
+class EMAFilter(BlockFilter):
+    """Экспоненциальное скользящее среднее с коэффициентом alpha = 1 / 2 ** k, без децимации.
+    Состояние фильтра хранится с k дополнительными младшими битами: y += x - (y >> k)."""
+
+    def __init__(self, k: int, extra_bits: int = None):
+        """k - показатель степени коэффициента сглаживания 1..16;
+        extra_bits - кол-во дополнительных бит в выходном отсчете. Если None, то int(resolution_gain)."""
+        if not 1 <= k <= 16:
+            raise ValueError(f"Неверный показатель степени EMA фильтра: {k}")
+        self._k = k
+        self._extra_bits = self._check_extra_bits(extra_bits, k)
+        self._shift = k - self._extra_bits
+        self._state = None
+
+    def reset(self):
+        self._state = None
+
+    @property
+    def resolution_gain(self) -> float:
+        # дисперсия шума уменьшается в (2 - alpha) / alpha раз
+        alpha = 1 / (1 << self._k)
+        return 0.5 * math.log2((2 - alpha) / alpha)
+
+    def process(self, src, dst, count: int = None) -> int:
+        _count = len(src) if count is None else count
+        if not _count:
+            return 0
+        return _ema(self, src, dst, _count)
+
+
+class FilteredADC:
+    """Ступень обработки отсчетов АЦП: блок 'сырых' отсчетов проходит через цепочку фильтров.
+    Все буферы выделяются в конструкторе."""
+
+    def __init__(self, adc: ["ADC", None], filters: tuple, block_size: int = 64, source=None):
+        """adc - АЦП, отсчеты которого читаются методом get_raw_value;
+        filters - кортеж фильтров (наследников BlockFilter), применяемых по порядку;
+        block_size - кол-во 'сырых' отсчетов, читаемых из АЦП за один вызов read_block;
+        source - функция без параметров, возвращающая очередной 'сырой' отсчет. Если None, то adc.get_raw_value.
+        Например, метод read_next экземпляра ADCScanSequencer с одним каналом."""
+        if block_size < 1:
+            raise ValueError(f"Неверный размер блока: {block_size}")
+        self._adc = adc
+        self._filters = filters
+        self._source = adc.get_raw_value if source is None else source
+        self._buf = array("i", (0 for _ in range(block_size)))
+
+    @property
+    def decimation(self) -> int:
+        """Общий коэффициент децимации цепочки фильтров"""
+        val = 1
+        for flt in self._filters:
+            val *= flt.decimation
+        return val
+
+    @property
+    def resolution_gain(self) -> float:
+        """Общий эффективный прирост разрешения цепочки фильтров в битах"""
+        return sum(flt.resolution_gain for flt in self._filters)
+
+    @property
+    def extra_bits(self) -> int:
+        """Общее кол-во дополнительных младших бит в выходном отсчете"""
+        return sum(flt.extra_bits for flt in self._filters)
+
+    def reset(self):
+        for flt in self._filters:
+            flt.reset()
+
+    def process(self, src, dst, count: int = None) -> int:
+        """Пропускает count отсчетов из src через цепочку фильтров. Результат записывается в dst.
+        Возвращает кол-во выходных отсчетов. Промежуточные результаты пишутся в dst!"""
+        _count = len(src) if count is None else count
+        buf = src
+        for flt in self._filters:
+            _count = flt.process(buf, dst, _count)
+            buf = dst
+        if buf is src:     # цепочка фильтров пуста
+            for i in range(_count):
+                dst[i] = src[i]
+        return _count
+
+    def read_block(self, dst) -> int:
+        """Читает block_size 'сырых' отсчетов, фильтрует их и записывает результат в dst (array('i') длиной
+        не менее block_size). Возвращает кол-во выходных отсчетов. Оно может быть равно нулю, если
+        децимирующему фильтру не хватило отсчетов!"""
+        buf = self._buf
+        _source = self._source
+        for i in range(len(buf)):
+            buf[i] = _source()
+        return self.process(buf, dst)
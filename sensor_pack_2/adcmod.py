@@ -3,8 +3,19 @@
 # MIT license
 
 # from sensor_pack_2.bus_service import mpy_bl
+import time
 from collections import namedtuple
-from sensor_pack_2.base_sensor import check_value
+from sensor_pack_2.base_sensor import is_trusted_mode, MutableRecord
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # разностный вход (bool, differential_input)
 # разрядность в битах (int, resolution)
@@ -13,6 +24,13 @@ from sensor_pack_2.base_sensor import check_value
 adc_base_props = namedtuple("adc_props", "ref_voltage resolution channels differential_channels")
 # кортеж информации о канале АЦП: number(номер канала):int, is_differential(дифференциальный_режим):bool
 adc_channel_info = namedtuple("adc_channel_info", "number is_differential")
+
+
+class AdcChannelInfo(MutableRecord):
+    """Изменяемый аналог adc_channel_info для параметра into метода get_current_channel"""
+    __slots__ = ("number", "is_differential")
+
+
 # кортеж информации о количестве(!) каналов АЦП
 # channels - количество обычных(single ended) каналов
 # differential_channels - количество дифференциальных(differential) каналов
@@ -40,6 +58,15 @@ adc_init_props = namedtuple("adc_init_props",
 # если low_limit в Истина, то "стрелка" АЦП на нижнем крае шкалы (underflow)
 # если hi_limit в Истина, то "стрелка" АЦП верхнем крае шкалы (overflow)
 raw_value_ex = namedtuple("raw_value_ex", "value low_limit hi_limit")
+# шаг сканирования каналов АЦП (класс ADCScanSequencer)
+# channel - номер канала
+# is_differential - если Истина, то канал дифференциальный
+# raw_config - заранее вычисленная 'сырая' конфигурация АЦП для этого канала
+adc_scan_step = namedtuple("adc_scan_step", "channel is_differential raw_config")
+# результат проверки блока отсчетов на переполнение (метод get_block_limits)
+# low_count - количество отсчетов на нижнем крае шкалы (underflow)
+# hi_count - количество отсчетов на верхнем крае шкалы (overflow)
+block_limits = namedtuple("block_limits", "low_count hi_count")
 
 # Типовое содержимое регистра конфигурации (все значения сырые/raw):
 # gain; коэффициент усиления для PGA-programmable gain amplifier (усилитель с программируемым усилением)
@@ -60,6 +87,50 @@ def _get_reg_raw_limits(adc_resolution: int, differential: bool) -> raw_value_ex
     return raw_value_ex(value=0, low_limit=0, hi_limit=2 ** adc_resolution - 1)
 
 
+# Блочные преобразования отсчетов. src - array с 'сырыми' отсчетами, dst - array('f') того же или большего размера.
+# В MicroPython используется код, компилируемый в машинный (native/viper), на 'большом' Python - NumPy,
+# если он установлен, иначе обычный цикл.
+if micropython is not None:
+    @micropython.native
+    def _scale_block(src, dst, k: float, count: int):
+        for i in range(count):
+            dst[i] = src[i] * k
+
+    @micropython.viper
+    def _count_in_range_16(buf: ptr16, count: int, lo: int, hi: int) -> int:
+        # только для array('h') и array('H')! ptr16 читает элемент, как беззнаковое значение
+        cnt = 0
+        for i in range(count):
+            val = int(buf[i])
+            if lo <= val <= hi:
+                cnt += 1
+        return cnt
+elif numpy is not None:
+    def _scale_block(src, dst, k: float, count: int):
+        _src = numpy.frombuffer(src, dtype=src.typecode, count=count)
+        _dst = numpy.frombuffer(dst, dtype=dst.typecode, count=count)
+        numpy.multiply(_src, k, out=_dst, casting="unsafe")
+else:
+    def _scale_block(src, dst, k: float, count: int):
+        for i in range(count):
+            dst[i] = src[i] * k
+
+
+def _count_in_range(src, count: int, lo: int, hi: int, mask: int) -> int:
+    """Возвращает количество элементов src[0..count-1], значение которых, после наложения маски mask,
+    попадает в диапазон lo..hi включительно. Маска переводит отрицательные отсчеты в 'сырой' вид регистра АЦП."""
+    if micropython is not None and src.typecode in "hH" and 0xFFFF == mask:
+        return _count_in_range_16(src, count, lo, hi)
+    if numpy is not None:
+        _src = numpy.bitwise_and(numpy.frombuffer(src, dtype=src.typecode, count=count), mask)
+        return int(numpy.count_nonzero((_src >= lo) & (_src <= hi)))
+    cnt = 0
+    for i in range(count):
+        if lo <= src[i] & mask <= hi:
+            cnt += 1
+    return cnt
+
+
 class ADC:
     def __init__(self, init_props: adc_init_props, model: str = None):
         """reference_voltage - опорное напряжение в Вольтах;
@@ -93,6 +164,10 @@ class ADC:
         self._low_pwr_mode = None
         # строковое имя модели АЦП
         self._model_name = model
+        # кэш цены младшего разряда, смотри метод get_lsb_cached
+        # ключ кэша: (действительный коэффициент усиления, разрешение в битах)
+        self._lsb_key = None
+        self._lsb = None
 
     @property
     def model(self) -> str:
@@ -121,8 +196,8 @@ class ADC:
         value должно быть в диапазоне 0..self._channels/self._diff_channels"""
         ipr = self.init_props
         _max = ipr.differential_channels if diff else ipr.channels
-        check_value(value, range(_max),
-                    f"Неверный номер канала АЦП: {value}; дифф: {diff}. Допустимый диапазон: 0..{_max - 1}")
+        if not is_trusted_mode() and value not in range(_max):
+            raise ValueError(f"Неверный номер канала АЦП: {value}; дифф: {diff}. Допустимый диапазон: 0..{_max - 1}")
         return value
 
     def check_gain_raw(self, gain_raw: int) -> int:
@@ -142,6 +217,15 @@ class ADC:
         _k = 2 if ipr.differential_mode else 1
         return _k * ipr.reference_voltage / (self.gain * 2 ** self.current_resolution)
 
+    def get_lsb_cached(self) -> float:
+        """Возвращает цену младшего разряда в Вольтах. Значение пересчитывается методом get_lsb только после
+        изменения усиления или разрешения АЦП."""
+        key = self.gain, self.current_resolution
+        if key != self._lsb_key:
+            self._lsb = self.get_lsb()
+            self._lsb_key = key
+        return self._lsb
+
     def get_conversion_cycle_time(self) -> int:
         """возвращает время преобразования в [мкc/мс] аналогового значения в цифровое в зависимости от
         текущих настроек АЦП. Переопредели для каждого АЦП!"""
@@ -172,7 +256,26 @@ class ADC:
 
     def raw_value_to_real(self, raw_val: int) -> float:
         """Преобразует 'сырое' значение из регистра АЦП в значение в Вольтах"""
-        return raw_val * self.get_lsb()
+        return raw_val * self.get_lsb_cached()
+
+    def raw_block_to_real(self, src, dst, count: int = None):
+        """Преобразует блок 'сырых' отсчетов src (array) в значения в Вольтах и записывает их в dst (array('f')).
+        count - кол-во преобразуемых отсчетов, если None, то len(src). Возвращает dst."""
+        _count = len(src) if count is None else count
+        if _count > len(dst):
+            raise ValueError(f"Недостаточный размер выходного буфера: {len(dst)}; требуется: {_count}")
+        _scale_block(src, dst, self.get_lsb_cached(), _count)
+        return dst
+
+    def get_block_limits(self, src, delta: int = 5, count: int = None) -> block_limits:
+        """Возвращает количество 'сырых' отсчетов блока src (array), находящихся на краях шкалы АЦП.
+        Смысл параметра delta такой же, как и у метода get_raw_value_ex."""
+        _count = len(src) if count is None else count
+        limits = _get_reg_raw_limits(self.current_resolution, self.init_props.differential_mode)
+        lo, hi = limits.low_limit, limits.hi_limit
+        mask = (1 << self.current_resolution) - 1
+        return block_limits(low_count=_count_in_range(src, _count, lo, lo + delta, mask),
+                            hi_count=_count_in_range(src, _count, hi - delta, hi, mask))
 
     def gain_raw_to_real(self, raw_gain: int) -> float:
         """Преобразует 'сырое' значение усиления в 'настоящее'.
@@ -191,9 +294,13 @@ class ADC:
         Переопределить в классе - наследнике!"""
         raise NotImplemented
 
-    def get_current_channel(self) -> adc_channel_info:
-        """Возвращает информацию о текущем активном канале АЦП"""
-        return adc_channel_info(number=self._curr_channel, is_differential=self._is_diff_channel)
+    def get_current_channel(self, into: AdcChannelInfo = None) -> [adc_channel_info, AdcChannelInfo]:
+        """Возвращает информацию о текущем активном канале АЦП.
+        Если into не None, то значения записываются в него и возвращается into."""
+        if into is None:
+            return adc_channel_info(number=self._curr_channel, is_differential=self._is_diff_channel)
+        into.number, into.is_differential = self._curr_channel, self._is_diff_channel
+        return into
 
     @property
     def channel(self) -> adc_channel_info:
@@ -293,3 +400,98 @@ class ADC:
         """Возвращает Истина, Если АЦП настроен на однократный(single shot conversion) режим работы,
         иначе на непрерывный (continuous conversion mode)"""
         return self._single_shot_mode
+
+
+class ADCScanSequencer:
+    """Последовательный опрос нескольких каналов АЦП по кругу (round-robin).
+    Сырая конфигурация АЦП для каждого канала из списка сканирования вычисляется один раз, в конструкторе.
+    Переключение канала сводится к записи готового значения в регистр конфигурации, ожиданию окончания
+    преобразования и чтению результата. Проверка параметров выполняется только в конструкторе!"""
+
+    def __init__(self, adc: ADC, channels: tuple, data_rate_raw: int, gain_raw: int,
+                 fast: bool = False, time_in_us: bool = True):
+        """adc - АЦП, каналы которого опрашиваются;
+        channels - кортеж номеров каналов (int, обычный канал) или пар (номер, дифференциальный: bool);
+        data_rate_raw, gain_raw - сырые частота отсчетов и коэффициент усиления, общие для всех каналов;
+        fast - если Истина, то конфигурация после записи в АЦП не считывается обратно для проверки;
+        time_in_us - если Истина, то get_conversion_cycle_time АЦП возвращает время в мкс, иначе в мс."""
+        if not channels:
+            raise ValueError("Пустой список каналов для сканирования!")
+        adc.check_gain_raw(gain_raw=gain_raw)
+        adc.check_data_rate_raw(data_rate_raw=data_rate_raw)
+        self._adc = adc
+        self._fast = fast
+        # АЦП всегда работает в режиме однократных измерений, которые запускаются записью конфигурации
+        adc._single_shot_mode = True
+        adc._curr_raw_data_rate = data_rate_raw
+        adc._curr_raw_gain = gain_raw
+        adc._curr_resolution = adc.get_resolution(data_rate_raw)
+        adc._real_gain = adc.gain_raw_to_real(gain_raw)
+        steps = list()
+        for item in channels:
+            number, diff = (item, False) if isinstance(item, int) else item
+            adc.check_channel_number(number, diff)
+            adc._curr_channel = number
+            adc._is_diff_channel = diff
+            steps.append(adc_scan_step(channel=number, is_differential=diff,
+                                       raw_config=adc.adc_properties_to_raw_config()))
+        self._steps = tuple(steps)
+        # время преобразования одинаково для всех каналов, так как частота отсчетов общая
+        self._sleep = time.sleep_us if time_in_us else time.sleep_ms
+        self._conv_time = adc.get_conversion_cycle_time()
+        # индекс следующего опрашиваемого канала
+        self._index = 0
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    @property
+    def fast(self) -> bool:
+        """Если Истина, то записанная в АЦП конфигурация не считывается обратно"""
+        return self._fast
+
+    @fast.setter
+    def fast(self, value: bool):
+        self._fast = value
+
+    @property
+    def index(self) -> int:
+        """Индекс канала в списке сканирования, который будет опрошен следующим"""
+        return self._index
+
+    def get_step(self, index: int) -> adc_scan_step:
+        """Возвращает информацию о шаге сканирования по его индексу"""
+        return self._steps[index]
+
+    def read_next(self) -> int:
+        """Опрашивает следующий канал из списка сканирования и возвращает 'сырое' значение отсчета."""
+        step = self._steps[self._index]
+        adc = self._adc
+        adc.set_raw_config(step.raw_config)
+        adc._curr_channel = step.channel
+        adc._is_diff_channel = step.is_differential
+        if not self._fast:
+            # проверочное чтение конфигурации, как в ADC.start_measurement
+            adc.raw_config_to_adc_properties(adc.get_raw_config())
+        self._sleep(self._conv_time)
+        self._index = (1 + self._index) % len(self._steps)
+        return adc.get_raw_value()
+
+    def scan(self, into=None):
+        """Опрашивает все каналы из списка сканирования, начиная с первого.
+        Результаты записываются в into (array или list длиной не менее len(self)), которая и возвращается.
+        Если into is None, то возвращается новый список."""
+        if into is None:
+            into = [0 for _ in range(len(self._steps))]
+        self._index = 0
+        _read_next = self.read_next
+        for i in range(len(self._steps)):
+            into[i] = _read_next()
+        return into
+
+    # протокол итератора
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        return self.read_next()
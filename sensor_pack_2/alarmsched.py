@@ -0,0 +1,147 @@
+# MicroPython
+# MIT license
+"""Планировщик программных 'будильников'. Любое кол-во программных будильников использует один аппаратный
+будильник RTC (IRTCwAlarms), в который всегда записывается время ближайшего события.
+Software alarm scheduler multiplexing any number of alarms onto one IRTCwAlarms hardware slot."""
+
+import heapq
+from sensor_pack_2.irtc import IRTCwAlarms, rtc_alarm_time, rtc_time
+from sensor_pack_2.ioexpander import IOExpander
+from sensor_pack_2.bitops import merge_bits
+from sensor_pack_2.rtcdate import time_to_epoch, epoch_to_time
+
+# бит-признак дня месяца в поле date_day кортежа rtc_alarm_time (смотри check_alarm_time)
+_DATE_BIT = 7
+
+
+class OutputAction:
+    """Действие будильника: записывает value в биты mask порта n_port расширителя ввода-вывода.
+    Остальные биты берутся из выходного регистра порта, а не из его входного значения."""
+
+    def __init__(self, expander: IOExpander, n_port: int, mask: int, value: int):
+        expander._check_port_numb(n_port)
+        self._expander = expander
+        self._n_port = n_port
+        self._mask = mask
+        self._value = value & mask
+
+    def __call__(self, now: int):
+        exp, n_port = self._expander, self._n_port
+        exp.write_port(n_port, merge_bits(exp.read_port_latch(n_port), self._value, self._mask))
+
+
+class AlarmScheduler:
+    """Хранит программные будильники в куче (heapq), упорядоченной по времени срабатывания.
+    Время ближайшего будильника записывается в аппаратный будильник RTC. Вывод прерывания RTC следует
+    подключить к MCU и из его обработчика (через micropython.schedule) вызывать метод service.
+    Аппаратный будильник RTC срабатывает с точностью до минуты, поэтому, если до события меньше минуты,
+    service возвращает время ожидания в мс, которое выдерживает вызывающий код (например, machine.lightsleep)."""
+
+    def __init__(self, rtc: IRTCwAlarms, clock=None, alarm_id: int = 0):
+        """rtc - RTC с аппаратными будильниками;
+        clock - источник времени с методом epoch() (например, rtcclock.CachedClock). Если None, то время
+        читается из rtc;
+        alarm_id - номер аппаратного будильника RTC, используемого планировщиком."""
+        cnt = rtc.get_alarms_count()
+        if not 0 <= alarm_id < cnt:
+            raise ValueError(f"Номер будильника {alarm_id} вне диапазона 0..{cnt - 1}!")
+        self._rtc = rtc
+        self._epoch = clock.epoch if clock is not None else self._read_epoch
+        self._alarm_id = alarm_id
+        # элементы кучи: [время срабатывания, порядковый номер, период, действие]
+        # порядковый номер нужен для однозначного сравнения элементов с одинаковым временем
+        self._heap = []
+        self._seq = 0
+        # время (в минутах от начала эпохи), записанное в аппаратный будильник, или None
+        self._armed_minute = None
+
+    def _read_epoch(self) -> int:
+        return time_to_epoch(self._rtc.get_time())
+
+    def __len__(self) -> int:
+        """Кол-во активных программных будильников"""
+        return sum(1 for item in self._heap if item[3] is not None)
+
+    def add(self, fire_at: [int, rtc_time], action, period: int = 0) -> list:
+        """Добавляет будильник. fire_at - время срабатывания в секундах от начала эпохи или rtc_time;
+        action - вызываемый объект с одним параметром (текущее время в секундах от начала эпохи);
+        period - период повторения в секундах, 0 - однократный будильник.
+        Возвращает описатель будильника для метода cancel. Аппаратный будильник перепрограммируется."""
+        if period < 0:
+            raise ValueError(f"Неверный период будильника: {period}")
+        if not isinstance(fire_at, int):
+            fire_at = time_to_epoch(fire_at)
+        item = [fire_at, self._seq, period, action]
+        self._seq += 1
+        heapq.heappush(self._heap, item)
+        self.arm()
+        return item
+
+    def cancel(self, handle: list):
+        """Отменяет будильник. Элемент удаляется из кучи позже, когда окажется на ее вершине."""
+        handle[3] = None
+        self.arm()
+
+    def _drop_cancelled(self):
+        heap = self._heap
+        while heap and heap[0][3] is None:
+            heapq.heappop(heap)
+
+    def next_fire_time(self) -> [int, None]:
+        """Возвращает время ближайшего будильника в секундах от начала эпохи или None"""
+        self._drop_cancelled()
+        heap = self._heap
+        return heap[0][0] if heap else None
+
+    def arm(self):
+        """Записывает время ближайшего будильника в аппаратный будильник RTC, если оно изменилось"""
+        fire_at = self.next_fire_time()
+        minute = None if fire_at is None else fire_at // 60
+        if minute == self._armed_minute:
+            return
+        if minute is None:
+            self._rtc.set_alarm(None, self._alarm_id)
+        else:
+            t = epoch_to_time(60 * minute)
+            self._rtc.set_alarm(rtc_alarm_time(date_day=(1 << _DATE_BIT) | t.day, hour=t.hour, min=t.min),
+                                self._alarm_id)
+        self._armed_minute = minute
+
+    def service(self) -> int:
+        """Сбрасывает флаги аппаратных будильников, выполняет действия всех наступивших будильников,
+        перезапускает периодические и перепрограммирует аппаратный будильник.
+        Возвращает время в мс до ближайшего будильника или -1, если будильников нет."""
+        self._rtc.get_alarm_flags(raw=True, clear=True)
+        now = self._epoch()
+        heap = self._heap
+        self._drop_cancelled()
+        while heap and heap[0][0] <= now:
+            item = heapq.heappop(heap)
+            action = item[3]
+            if action is None:
+                continue
+            action(now)
+            period = item[2]
+            if period and item[3] is not None:
+                # пропущенные срабатывания не выполняются
+                fire_at = item[0] + period
+                if fire_at <= now:
+                    fire_at += period * (1 + (now - fire_at) // period)
+                item[0] = fire_at
+                heapq.heappush(heap, item)
+            self._drop_cancelled()
+        # аппаратный будильник уже сработал, поэтому его нужно записать заново
+        self._armed_minute = None
+        self.arm()
+        if not heap:
+            return -1
+        return 1000 * (heap[0][0] - now)
+
+    def idle(self, sleep_func):
+        """Выполняет наступившие будильники и 'спит' до ближайшего будильника, вызывая sleep_func(мс),
+        например machine.lightsleep. Если будильников нет, sleep_func не вызывается.
+        Если до будильника больше минуты, MCU разбудит прерывание аппаратного будильника RTC,
+        при условии, что его вывод настроен для пробуждения."""
+        wait_ms = self.service()
+        if wait_ms > 0:
+            sleep_func(wait_ms)
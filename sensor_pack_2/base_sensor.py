@@ -4,18 +4,54 @@
 import struct
 import micropython
 from sensor_pack_2 import bus_service
-from machine import Pin
+
+
+# Режим 'доверия'. Если Истина, то функции check_value, check_value_fmt, check_value_ex ничего не проверяют.
+# Включайте его после отладки программы, чтобы проверки не тратили время в 'горячих' местах кода.
+_trusted = False
+
+
+def set_trusted_mode(value: bool):
+    """Включает (value is True) или выключает режим 'доверия', в котором значения не проверяются"""
+    global _trusted
+    _trusted = value
+
+
+def is_trusted_mode() -> bool:
+    """Возвращает Истина, если включен режим 'доверия', в котором значения не проверяются"""
+    return _trusted
 
 
 @micropython.native
 def check_value(value: [int, None], valid_range: [range, tuple], error_msg: str) -> [int, None]:
-    if value is None:
+    if value is None or _trusted:
         return value
     if value not in valid_range:
         raise ValueError(error_msg)
     return value
 
 
+@micropython.native
+def check_value_fmt(value: [int, None], valid_range: [range, tuple], fmt: str) -> [int, None]:
+    """То же, что и check_value, но сообщение об ошибке формируется только при ошибке: fmt.format(value).
+    Для 'горячих' мест кода, где f-строка, вычисляемая перед каждым вызовом check_value, стоит дорого."""
+    if value is None or _trusted:
+        return value
+    if value not in valid_range:
+        raise ValueError(fmt.format(value))
+    return value
+
+
+@micropython.native
+def check_value_ex(value: [int, None], valid_range: [range, tuple], val_name: str) -> [int, None]:
+    """То же, что и check_value, но сообщение об ошибке формируется только при ошибке функцией get_error_str."""
+    if value is None or _trusted:
+        return value
+    if value not in valid_range:
+        raise ValueError(get_error_str(val_name, value, valid_range))
+    return value
+
+
 def get_error_str(val_name: str, val: int, rng: [range, tuple]) -> str:
     """Возвращает подробное сообщение об ошибке.
     val_name - имя переменной в коде;
@@ -27,6 +63,19 @@ def get_error_str(val_name: str, val: int, rng: [range, tuple]) -> str:
     return f"Значение {val} параметра {val_name} вне диапазона: {rng}!"
 
 
+def lazy_namedtuple(module_globals: dict, name: str, fields: str):
+    """Возвращает именованный кортеж name из словаря module_globals (globals() модуля).
+    При первом обращении создает его и записывает в module_globals.
+    Для отложенного создания редко используемых именованных кортежей, чтобы не тратить на это время
+    и память при импорте модуля."""
+    nt = module_globals.get(name)
+    if nt is None:
+        from collections import namedtuple
+        nt = namedtuple(name, fields)
+        module_globals[name] = nt
+    return nt
+
+
 def all_none(*args):
     """возвращает Истина, если все входные параметры в None.
     Добавил 25.01.2024"""
@@ -36,10 +85,34 @@ def all_none(*args):
     return True
 
 
+class MutableRecord:
+    """Изменяемая запись с фиксированным набором полей, перечисленных в __slots__ класса-наследника.
+    Аналог именованного кортежа, экземпляр которого создается один раз и затем многократно заполняется методами,
+    имеющими параметр into. Поэтому опрос в цикле или в обработчике прерывания не создает 'мусора' в куче.
+    Доступ к полям по имени и по индексу, как у именованного кортежа."""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        """values - значения полей по порядку. Недостающие поля равны None"""
+        names = self.__slots__
+        for i in range(len(names)):
+            setattr(self, names[i], values[i] if i < len(values) else None)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __getitem__(self, index: int):
+        return getattr(self, self.__slots__[index])
+
+    def __repr__(self) -> str:
+        items = ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({items})"
+
+
 class Device:
     """Класс - основа датчика"""
 
-    def __init__(self, adapter: bus_service.BusAdapter, address: [int, Pin], big_byte_order: bool):
+    def __init__(self, adapter: bus_service.BusAdapter, address: [int, "Pin"], big_byte_order: bool):
         """Базовый класс Устройство.
         Если big_byte_order равен True -> порядок байтов в регистрах устройства «big»
         (Порядок от старшего к младшему), в противном случае порядок байтов в регистрах "little"
@@ -3,7 +3,8 @@
 # Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
 """Представление битового поля"""
 from collections import namedtuple
-from sensor_pack_2.base_sensor import check_value, get_error_str
+from sensor_pack_2.base_sensor import check_value_ex
+from sensor_pack_2.bitops import bit_mask, extract_bits, insert_bits
 
 # информация о битовом поле в виде именованного кортежа
 # name: str  - имя
@@ -16,7 +17,7 @@ bit_field_info = namedtuple("bit_field_info", "name position valid_values descri
 def _bitmask(bit_rng: range) -> int:
     """возвращает битовую маску по занимаемым битам"""
     # return sum(map(lambda x: 2 ** x, bit_rng))
-    return sum(map(lambda x: 1 << x, bit_rng))
+    return bit_mask(bit_rng.start, len(bit_rng))
 
 
 class BitFields:
@@ -65,8 +66,7 @@ class BitFields:
         if item is None:
             raise ValueError(f"get_field_value. Поле с именем {field_name} не существует!")
         pos = item.position
-        bitmask = _bitmask(pos)
-        val = (self.source & bitmask) >> pos.start  # выделение маской битового диапазона и его сдвиг вправо
+        val = extract_bits(self.source, pos.start, len(pos))  # выделение битового диапазона и его сдвиг вправо
         if item.valid_values and validate:
             raise NotImplemented("Если вы решили проверить значение поля при его возвращении, то делайте это самостоятельно!!!")
         if 1 == len(pos):
@@ -82,11 +82,10 @@ class BitFields:
         item = self._get_field(key=field)     #   *
         rng = item.valid_values
         if rng and validate:
-            check_value(value, rng, get_error_str(self.field_name, value, rng))
+            check_value_ex(value, rng, self.field_name)
         pos = item.position
-        bitmask = _bitmask(pos)
-        src = self._get_source(source) & ~bitmask  # чистка битового диапазона
-        src |= (value << pos.start) & bitmask  # установка битов в заданном диапазоне
+        # чистка битового диапазона и установка битов в заданном диапазоне
+        src = insert_bits(self._get_source(source), value, pos.start, len(pos))
         if source is None:
             self._source_val = src
         return src
@@ -0,0 +1,106 @@
+# MicroPython
+# MIT license
+"""Битовые операции, компилируемые в машинный код (@micropython.viper): построение маски, извлечение и вставка
+битового поля, подсчет единичных бит, перестановка бит в обратном порядке, выделение фронтов.
+На 'большом' Python используются те же функции без компиляции.
+Все значения - неотрицательные, не более 30 бит (порты расширителей, регистры датчиков)!
+Bit manipulation kernels compiled with @micropython.viper, with the same plain Python code as a fallback."""
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+
+# Одни и те же функции: в MicroPython - с декоратором @micropython.viper (он существует только при компиляции,
+# вызвать micropython.viper(func) во время выполнения нельзя), на 'большом' Python - без него.
+if micropython is not None:
+    @micropython.viper
+    def bit_mask(start: int, width: int) -> int:
+        """Возвращает маску из width единичных бит, начиная с бита номер start"""
+        return ((1 << width) - 1) << start
+
+    @micropython.viper
+    def extract_bits(value: int, start: int, width: int) -> int:
+        """Возвращает битовое поле шириной width бит, начиная с бита номер start, из value"""
+        return (value >> start) & ((1 << width) - 1)
+
+    @micropython.viper
+    def insert_bits(dst: int, value: int, start: int, width: int) -> int:
+        """Возвращает dst, в котором битовое поле шириной width бит, начиная с бита номер start, заменено на value"""
+        mask = ((1 << width) - 1) << start
+        return (dst ^ (dst & mask)) | ((value << start) & mask)
+
+    @micropython.viper
+    def merge_bits(dst: int, value: int, mask: int) -> int:
+        """Возвращает dst, в котором биты, равные 1 в mask, заменены соответствующими битами value"""
+        return (dst ^ (dst & mask)) | (value & mask)
+
+    @micropython.viper
+    def popcount(value: int) -> int:
+        """Возвращает количество единичных бит в value"""
+        cnt = 0
+        while value:
+            value &= value - 1
+            cnt += 1
+        return cnt
+
+    @micropython.viper
+    def reverse_bits(value: int, width: int) -> int:
+        """Возвращает младшие width бит value в обратном порядке"""
+        result = 0
+        for _ in range(width):
+            result = (result << 1) | (value & 1)
+            value >>= 1
+        return result
+
+    @micropython.viper
+    def changed_bits(prev: int, curr: int) -> int:
+        """Возвращает маску бит, состояние которых изменилось"""
+        return prev ^ curr
+
+    @micropython.viper
+    def rising_edges(prev: int, curr: int) -> int:
+        """Возвращает маску бит, изменивших состояние с 0 на 1"""
+        return (prev ^ curr) & curr
+
+    @micropython.viper
+    def falling_edges(prev: int, curr: int) -> int:
+        """Возвращает маску бит, изменивших состояние с 1 на 0"""
+        return (prev ^ curr) & prev
+else:
+    def bit_mask(start: int, width: int) -> int:
+        return ((1 << width) - 1) << start
+
+    def extract_bits(value: int, start: int, width: int) -> int:
+        return (value >> start) & ((1 << width) - 1)
+
+    def insert_bits(dst: int, value: int, start: int, width: int) -> int:
+        mask = ((1 << width) - 1) << start
+        return (dst ^ (dst & mask)) | ((value << start) & mask)
+
+    def merge_bits(dst: int, value: int, mask: int) -> int:
+        return (dst ^ (dst & mask)) | (value & mask)
+
+    def popcount(value: int) -> int:
+        cnt = 0
+        while value:
+            value &= value - 1
+            cnt += 1
+        return cnt
+
+    def reverse_bits(value: int, width: int) -> int:
+        result = 0
+        for _ in range(width):
+            result = (result << 1) | (value & 1)
+            value >>= 1
+        return result
+
+    def changed_bits(prev: int, curr: int) -> int:
+        return prev ^ curr
+
+    def rising_edges(prev: int, curr: int) -> int:
+        return (prev ^ curr) & curr
+
+    def falling_edges(prev: int, curr: int) -> int:
+        return (prev ^ curr) & prev
@@ -0,0 +1,174 @@
+# micropython
+# MIT license
+"""Адаптер шины I2C с восстановлением после ошибок: повторы с ограничением по времени, освобождение шины
+импульсами SCL (bus clear), 'автоматический выключатель' (circuit breaker) для каждого адреса и счетчики событий.
+Загружается при первом обращении к bus_service.ResilientI2cAdapter.
+I2C adapter with bounded retries, SCL-pulse bus clear, per-address circuit breaker and event counters."""
+
+import errno
+import time
+from sensor_pack_2.bus_service import I2cAdapter
+
+
+class DeviceUnavailableError(OSError):
+    """Устройство пропущено: 'автоматический выключатель' его адреса разомкнут"""
+
+
+class BusStats:
+    """Счетчики событий шины"""
+    __slots__ = ("transfers", "errors", "retries", "bus_clears", "breaker_trips", "skipped")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Обнуляет счетчики"""
+        self.transfers = self.errors = self.retries = self.bus_clears = self.breaker_trips = self.skipped = 0
+
+    def __repr__(self) -> str:
+        return "BusStats(" + ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__) + ")"
+
+
+class ResilientI2cAdapter(I2cAdapter):
+    """Адаптер шины I2C, повторяющий операцию при OSError не более retries раз и не дольше budget_ms.
+    Если операция с устройством не удалась failure_threshold раз подряд, его адрес 'отключается' на время backoff_ms:
+    операции с ним сразу завершаются исключением DeviceUnavailableError без обращения к шине, а остальные устройства
+    работают без задержек. После паузы разрешается одна пробная операция. Ее неудача удваивает паузу
+    (не более max_backoff_ms), успех восстанавливает обычную работу.
+    При таймауте шины выполняется освобождение шины (bus clear), если заданы выводы SCL и SDA."""
+
+    def __init__(self, bus: "I2C", retries: int = 2, budget_ms: int = 20, failure_threshold: int = 3,
+                 backoff_ms: int = 1000, max_backoff_ms: int = 60_000, scl: int = None, sda: int = None,
+                 bus_factory=None):
+        """bus - шина I2C; retries - кол-во повторов операции; budget_ms - наибольшее время операции с повторами, мс;
+        failure_threshold - кол-во неудачных операций подряд, после которого адрес 'отключается';
+        backoff_ms, max_backoff_ms - начальная и наибольшая пауза 'отключения' адреса, мс;
+        scl, sda - номера выводов шины для bus clear. Если None, то bus clear не выполняется;
+        bus_factory - функция без параметров, создающая шину заново после bus clear (выводы шины после
+        bus clear настроены как GPIO и отключены от аппаратного I2C). Например:
+        lambda: I2C(1, scl=Pin(7), sda=Pin(6), freq=400_000). Обязательна, если заданы scl и sda!"""
+        if (scl is not None or sda is not None) and (scl is None or sda is None or bus_factory is None):
+            raise ValueError("Для bus clear нужны scl, sda и bus_factory!")
+        super().__init__(bus)
+        self._retries = retries
+        self._budget_ms = budget_ms
+        self._threshold = failure_threshold
+        self._backoff_ms = backoff_ms
+        self._max_backoff_ms = max_backoff_ms
+        self._scl = scl
+        self._sda = sda
+        self._bus_factory = bus_factory
+        # адрес: [неудач подряд, пауза 'отключения', мс, время (ticks_ms) окончания паузы]
+        self._breakers = {}
+        self.stats = BusStats()
+
+    def is_available(self, device_addr: int) -> bool:
+        """Возвращает Ложь, если адрес 'отключен' и пауза еще не закончилась"""
+        state = self._breakers.get(device_addr)
+        return state is None or state[0] < self._threshold or time.ticks_diff(time.ticks_ms(), state[2]) >= 0
+
+    def get_failures(self, device_addr: int) -> int:
+        """Возвращает кол-во неудачных операций подряд с устройством"""
+        state = self._breakers.get(device_addr)
+        return 0 if state is None else state[0]
+
+    def reset_breaker(self, device_addr: int = None):
+        """Восстанавливает обычную работу с адресом (или со всеми адресами, если device_addr is None)"""
+        if device_addr is None:
+            self._breakers.clear()
+        else:
+            self._breakers.pop(device_addr, None)
+
+    def _on_failure(self, device_addr: int):
+        state = self._breakers.get(device_addr)
+        if state is None:
+            state = self._breakers[device_addr] = [0, self._backoff_ms, 0]
+        state[0] += 1
+        if state[0] < self._threshold:
+            return
+        if state[0] > self._threshold:
+            # неудачная пробная операция после паузы
+            state[1] = min(self._max_backoff_ms, state[1] << 1)
+        state[2] = time.ticks_add(time.ticks_ms(), state[1])
+        self.stats.breaker_trips += 1
+
+    def bus_clear(self) -> bool:
+        """Освобождение шины, 'зависшей' из-за ведомого устройства, удерживающего SDA в нуле (например, после
+        сброса MCU посреди чтения): до 9 импульсов SCL, пока SDA не освободится, затем условие STOP.
+        Возвращает Истина, если SDA освободилась. Затем шина создается заново функцией bus_factory."""
+        if self._scl is None or self._sda is None:
+            return False
+        from machine import Pin
+        self.stats.bus_clears += 1
+        scl = Pin(self._scl, Pin.OPEN_DRAIN, value=1)
+        sda = Pin(self._sda, Pin.OPEN_DRAIN, value=1)
+        for _ in range(9):
+            if sda.value():
+                break
+            scl.value(0)
+            time.sleep_us(5)
+            scl.value(1)
+            time.sleep_us(5)
+        released = 1 == sda.value()
+        # STOP: фронт SDA при SCL = 1
+        scl.value(0)
+        sda.value(0)
+        time.sleep_us(5)
+        scl.value(1)
+        time.sleep_us(5)
+        sda.value(1)
+        self.bus = self._bus_factory()
+        return released
+
+    def _run(self, op, device_addr: int, *args):
+        """Выполняет операцию шины op(device_addr, *args) с повторами и учетом 'автоматического выключателя'"""
+        stats = self.stats
+        state = self._breakers.get(device_addr)
+        if state is not None and state[0] >= self._threshold \
+                and time.ticks_diff(time.ticks_ms(), state[2]) < 0:
+            stats.skipped += 1
+            raise DeviceUnavailableError(f"Устройство 0x{device_addr:x} временно отключено!")
+        start = time.ticks_ms()
+        attempt = 0
+        cleared = False
+        while True:
+            stats.transfers += 1
+            try:
+                result = op(device_addr, *args)
+            except OSError as e:
+                stats.errors += 1
+                attempt += 1
+                if attempt > self._retries or time.ticks_diff(time.ticks_ms(), start) >= self._budget_ms:
+                    self._on_failure(device_addr)
+                    raise
+                # таймаут шины обычно означает, что ведомое устройство удерживает SDA в нуле
+                if not cleared and e.args and errno.ETIMEDOUT == e.args[0]:
+                    cleared = True
+                    self.bus_clear()
+                stats.retries += 1
+                continue
+            if state is not None:
+                del self._breakers[device_addr]
+            return result
+
+    def write_register(self, device_addr: int, reg_addr: int, value: [int, bytes, bytearray],
+                       bytes_count: int, byte_order: str):
+        return self._run(super().write_register, device_addr, reg_addr, value, bytes_count, byte_order)
+
+    def read_register(self, device_addr: int, reg_addr: int, bytes_count: int) -> bytes:
+        return self._run(super().read_register, device_addr, reg_addr, bytes_count)
+
+    def read(self, device_addr: int, n_bytes: int) -> bytes:
+        return self._run(super().read, device_addr, n_bytes)
+
+    def read_to_buf(self, device_addr: int, buf: bytearray) -> bytes:
+        return self._run(super().read_to_buf, device_addr, buf)
+
+    def write(self, device_addr: int, buf: bytes):
+        return self._run(super().write, device_addr, buf)
+
+    def read_buf_from_memory(self, device_addr: int, mem_addr, buf, address_size: int = 1):
+        return self._run(super().read_buf_from_memory, device_addr, mem_addr, buf, address_size)
+
+    def write_buf_to_memory(self, device_addr: int, mem_addr, buf):
+        return self._run(super().write_buf_to_memory, device_addr, mem_addr, buf)
@@ -49,4 +49,15 @@ class DAC:
         Если значение имеет тип int, то будет записано сырое значение, которое должно быть в диапазоне get_out_range!
         Если значение имеет тип float (0.0 .. 100.0 %) то в выходной регистр будет записано сырое значение,
         соответствующее value в % от get_out_range.stop - 1."""
+        raise NotImplementedError
+
+    def get_burst_size(self) -> int:
+        """Возвращает наибольшее количество отсчетов, которое ЦАП принимает за одну транзакцию на шине
+        (методом write_raw_burst). Если ЦАП этого не поддерживает, то возвращает 1.
+        Для переопределения в классе-наследнике!"""
+        return 1
+
+    def write_raw_burst(self, buf, count: int):
+        """Записывает в выходной регистр ЦАП count 'сырых' значений из buf (array) за одну транзакцию на шине.
+        count не больше get_burst_size(). Для переопределения в классе-наследнике!"""
         raise NotImplementedError
\ No newline at end of file
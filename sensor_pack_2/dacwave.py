@@ -0,0 +1,141 @@
+# MicroPython
+# MIT license
+"""Формирование сигналов произвольной формы с помощью ЦАП по заранее вычисленным таблицам 'сырых' кодов.
+Waveform generation with a DAC using precomputed tables of raw codes."""
+
+import math
+from array import array
+from sensor_pack_2.dacmod import DAC, check_percent_rng
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+# разрядность фазового аккумулятора. Значение фазы должно помещаться в 'малое' целое MicroPython (31 бит),
+# иначе в обработчике таймера будет выделяться память!
+PHASE_BITS = 24
+
+
+def _get_typecode(dac: DAC) -> str:
+    """Возвращает код типа элемента array для 'сырых' значений ЦАП"""
+    if not dac.unipolar:
+        raise ValueError("Таблицы поддерживаются только для однополярного ЦАП!")
+    return "H" if dac.resolution <= 16 else "L"
+
+
+def make_table(dac: DAC, percents) -> array:
+    """Возвращает таблицу 'сырых' кодов ЦАП для последовательности значений percents в процентах (0..100)
+    от наибольшего значения выходного регистра. Произвольная форма сигнала."""
+    top = dac.get_out_range().stop - 1
+    return array(_get_typecode(dac), (round(0.01 * check_percent_rng(p) * top) for p in percents))
+
+
+def make_sine_table(dac: DAC, length: int = 256, amplitude: float = 50.0, offset: float = 50.0) -> array:
+    """Возвращает таблицу одного периода синуса длиной length отсчетов.
+    amplitude - амплитуда, offset - постоянная составляющая, оба в процентах."""
+    k = 2 * math.pi / length
+    return make_table(dac, (offset + amplitude * math.sin(k * i) for i in range(length)))
+
+
+def make_ramp_table(dac: DAC, length: int = 256, start: float = 0.0, stop: float = 100.0) -> array:
+    """Возвращает таблицу линейно нарастающего (пилообразного) сигнала длиной length отсчетов.
+    start, stop - начальное и конечное значения в процентах."""
+    k = (stop - start) / (length - 1)
+    return make_table(dac, (start + k * i for i in range(length)))
+
+
+class WaveformPlayer:
+    """Воспроизведение таблицы 'сырых' кодов ЦАП с заданной частотой обновления выхода.
+    Частота сигнала задается приращением фазового аккумулятора (DDS), поэтому одна таблица годится для любой
+    частоты сигнала, не превышающей половину частоты обновления. Длина таблицы - степень двойки!
+    Если ЦАП принимает несколько отсчетов за одну транзакцию (get_burst_size() > 1), то включается пакетный режим."""
+
+    def __init__(self, dac: DAC, table: array, update_rate: int, burst: bool = True):
+        """dac - ЦАП;
+        table - таблица 'сырых' кодов, смотри make_table и др.;
+        update_rate - частота обновления выхода ЦАП, Гц. В пакетном режиме должна быть кратна кол-ву отсчетов
+        в пакете, иначе таймер не обеспечит эту частоту;
+        burst - если Истина и ЦАП это поддерживает, то отсчеты передаются пакетами."""
+        n = len(table)
+        if n < 2 or n & (n - 1):
+            raise ValueError(f"Длина таблицы должна быть степенью двойки: {n}")
+        if update_rate <= 0:
+            raise ValueError(f"Неверная частота обновления: {update_rate}")
+        self._dac = dac
+        self._table = table
+        self._update_rate = update_rate
+        # индекс в таблице - старшие биты фазы
+        self._index_shift = PHASE_BITS
+        while n > 1:
+            n >>= 1
+            self._index_shift -= 1
+        self._phase_mask = (1 << PHASE_BITS) - 1
+        self._phase = 0
+        self._phase_inc = 0
+        self._burst_size = dac.get_burst_size() if burst else 1
+        if update_rate % self._burst_size:
+            raise ValueError(f"Частота обновления {update_rate} Гц не кратна размеру пакета {self._burst_size}")
+        # буфер передачи, выделяется один раз
+        self._tx_buf = array(table.typecode, (0 for _ in range(self._burst_size)))
+        self._timer = None
+        # ссылка на метод создается один раз, для micropython.schedule в обработчике таймера
+        self._tick_ref = self.tick
+        self.set_frequency(update_rate / len(table))
+
+    @property
+    def burst_size(self) -> int:
+        """Кол-во отсчетов, передаваемых за одну транзакцию"""
+        return self._burst_size
+
+    @property
+    def update_rate(self) -> int:
+        """Частота обновления выхода ЦАП, Гц"""
+        return self._update_rate
+
+    def set_frequency(self, freq: float):
+        """Устанавливает частоту воспроизводимого сигнала, Гц"""
+        if not 0 <= freq <= 0.5 * self._update_rate:
+            raise ValueError(f"Частота {freq} Гц вне диапазона 0..{0.5 * self._update_rate} Гц")
+        self._phase_inc = int(freq * (1 << PHASE_BITS) / self._update_rate)
+
+    def get_frequency(self) -> float:
+        """Возвращает действительную частоту воспроизводимого сигнала, Гц"""
+        return self._phase_inc * self._update_rate / (1 << PHASE_BITS)
+
+    def set_table(self, table: array):
+        """Заменяет таблицу кодов на таблицу той же длины, например, во время воспроизведения"""
+        if len(table) != len(self._table):
+            raise ValueError("Длина новой таблицы должна совпадать с длиной текущей!")
+        self._table = table
+
+    def tick(self, _=None):
+        """Выводит в ЦАП очередной отсчет (или пакет отсчетов). Вызывается с частотой update_rate / burst_size."""
+        table, buf = self._table, self._tx_buf
+        phase, inc, mask, shift = self._phase, self._phase_inc, self._phase_mask, self._index_shift
+        n = self._burst_size
+        for i in range(n):
+            buf[i] = table[phase >> shift]
+            phase = (phase + inc) & mask
+        self._phase = phase
+        if 1 == n:
+            self._dac.set_output(buf[0])
+        else:
+            self._dac.write_raw_burst(buf, n)
+
+    def _on_timer(self, timer):
+        # обработчик прерывания таймера. Работа с шиной в обработчике прерывания невозможна на многих платах!
+        micropython.schedule(self._tick_ref, None)
+
+    def start(self, timer):
+        """Запуск воспроизведения. timer - экземпляр machine.Timer, который будет вызывать tick"""
+        self.stop()
+        self._phase = 0
+        self._timer = timer
+        timer.init(freq=self._update_rate // self._burst_size, mode=timer.PERIODIC, callback=self._on_timer)
+
+    def stop(self):
+        """Остановка воспроизведения"""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
@@ -1,9 +1,10 @@
 """Интерфейс расширителей ввода-вывода.
 I/O expander interface."""
 
+from array import array
 from collections import namedtuple
 from sensor_pack_2.base_sensor import Iterator
-from sensor_pack_2.base_sensor import check_value
+from sensor_pack_2.base_sensor import check_value_fmt, lazy_namedtuple, MutableRecord
 
 _pin_config = "digital_input pull_up pull_down int_req_enable"
 # digital_input - если бит в Истина(1), то вывод является дискретным входом, иначе дискретным выходом (обычно(!). Такие значения
@@ -11,10 +12,23 @@ _pin_config = "digital_input pull_up pull_down int_req_enable"
 # pull_up - если бит в Истина(1), то вывод подтянут к напряжению питания микросхемы +Vcc (читайте даташит на микросхему!).
 # pull_down - если бит в Истина(1), то вывод подтянут к GND (читайте даташит на микросхему!).
 # int_req_enable - если бит в Истина(1), то вывод вызывает прерывание
-pin_config = namedtuple("pin_config", _pin_config)
 
 _port_info = "count width"
-port_info = namedtuple("port_info", _port_info)
+# именованные кортежи pin_config и port_info не нужны для основной работы с портами, поэтому они создаются
+# при первом обращении к ним (смотри __getattr__)
+_lazy_types = {"pin_config": _pin_config, "port_info": _port_info}
+
+
+def _lazy(name: str):
+    return lazy_namedtuple(globals(), name, _lazy_types[name])
+
+
+def __getattr__(name: str):
+    """Отложенное создание редко используемых именованных кортежей модуля"""
+    if name in _lazy_types:
+        return _lazy(name)
+    raise AttributeError(name)
+
 
 # _port_config_raw = "direction_reg input_invert_reg int_on_change_reg pull_reg"
 _port_config_raw = "direction_reg input_invert_reg pull_reg"
@@ -31,22 +45,42 @@ port_config_raw = namedtuple("port_config_raw", _port_config_raw)
 # int_on_change_reg - адрес регистра настройки генерации прерывания микросхемой-расширителем при изменении состояния входа/входов (DI)
 port_config_addr = namedtuple("port_config_addr", _port_config_raw)
 
+
+class PortConfigRaw(MutableRecord):
+    """Изменяемый аналог port_config_raw для параметра into метода get_port_config_raw"""
+    __slots__ = ("direction_reg", "input_invert_reg", "pull_reg")
+
+
+class PinConfig(MutableRecord):
+    """Изменяемый аналог pin_config для параметра into метода get_pin_config"""
+    __slots__ = ("digital_input", "pull_up", "pull_down", "int_req_enable")
+
+
 class IOExpander(Iterator):
     """Расширитель ввода-вывода. Общий интерфейс. I/O Expander. Common Interface."""
+    # Истина, если у микросхемы есть регистры настройки портов (направление, инверсия входов, подтяжка)
+    has_config_regs = True
 
     def __init__(self, port_count: int = 2, port_width : int = 8):
         self._port_count = port_count
         self._port_width = port_width
         self._active_port = 0
+        # допустимые диапазоны номеров портов и выводов, вычисляются один раз
+        self._port_rng = range(port_count)
+        self._pin_rng = range(port_width)
+        # копия состояния микросхемы: значения выходов и настройка портов (смотри save_state, restore_state).
+        # Наследники обновляют ее при записи в порты и их настройке
+        self._state_out = array("H", (0 for _ in range(port_count)))
+        self._state_cfg = None
 
     def _check_port_numb(self, n_port: int) -> int:
         """Проверяет номер порта на правильность"""
-        check_value(n_port, range(self._port_count), f"Неверный номер порта: {n_port}")
+        check_value_fmt(n_port, self._port_rng, "Неверный номер порта: {}")
         return n_port
 
     def _check_pin_numb(self, n_pin: int) -> int:
         """Проверяет номер вывода порта на правильность"""
-        check_value(n_pin, range(self._port_width), f"Неверный номер вывода/pin: {n_pin}")
+        check_value_fmt(n_pin, self._pin_rng, "Неверный номер вывода/pin: {}")
         return n_pin
 
     # PORT
@@ -63,29 +97,113 @@ class IOExpander(Iterator):
         """Возвращает текущий активный порт расширителя"""
         return self._active_port
 
-    def get_port_info(self) -> port_info:
+    def get_port_info(self) -> "port_info":
         """Возвращает информацию о порте ввода-вывода."""
-        return port_info(count=self._port_count, width=self._port_width)
+        return _lazy("port_info")(count=self._port_count, width=self._port_width)
 
-    def get_port_value(self) -> int:
-        """Возвращает содержимое регистра порта ввода(DI)). Для переопределения в наследниках!"""
+    # PORT (явный номер порта). Не зависят от текущего активного порта, поэтому один экземпляр расширителя
+    # можно использовать из разных потоков/обработчиков без переключения активного порта.
+    def read_port(self, n_port: int) -> int:
+        """Возвращает содержимое регистра порта ввода(DI) n_port. Для переопределения в наследниках!"""
         raise NotImplemented
 
-    def set_port_value(self, value: int):
-        """Устанавливает содержимое регистра порта вывода(DO). Для переопределения в наследниках!"""
+    def write_port(self, n_port: int, value: int):
+        """Устанавливает содержимое регистра порта вывода(DO) n_port. Для переопределения в наследниках!"""
         raise NotImplemented
 
+    def config_port(self, n_port: int, config: port_config_raw):
+        """Записывает в соотв. регистры настройки(!) порта n_port значения в 'сыром' виде.
+        Поля config, равные None, не записываются. Для переопределения в наследниках!"""
+        raise NotImplemented
+
+    def read_port_config(self, n_port: int, into: PortConfigRaw = None) -> [port_config_raw, PortConfigRaw]:
+        """Возвращает содержимое регистров настройки(!) порта n_port в сыром виде.
+        Если into не None, то значения записываются в него и возвращается into.
+        Для переопределения в наследниках!"""
+        raise NotImplemented
+
+    # PORT (текущий активный порт)
+    def get_port_value(self) -> int:
+        """Возвращает содержимое регистра порта ввода(DI)) текущего активного порта"""
+        return self.read_port(self._active_port)
+
+    def set_port_value(self, value: int):
+        """Устанавливает содержимое регистра порта вывода(DO) текущего активного порта"""
+        self.write_port(self._active_port, value)
+
     # PORT RAW
     def set_port_config_raw(self, config: port_config_raw):
-        """Записывает в соотв. регистры настройки(!) текущего активного порта значения в 'сыром' виде.
+        """Записывает в соотв. регистры настройки(!) текущего активного порта значения в 'сыром' виде."""
+        self.config_port(self._active_port, config)
+
+    def get_port_config_raw(self, into: PortConfigRaw = None) -> [port_config_raw, PortConfigRaw]:
+        """Возвращает содержимое регистров настройки(!) текущего активного порта в сыром виде.
+        Если into не None, то значения записываются в него и возвращается into."""
+        return self.read_port_config(self._active_port, into)
+
+    # SNAPSHOT
+    def snapshot(self, into, start: int = 0) -> int:
+        """Записывает значения входов всех портов в into (array('H') или bytearray для 8-ми битных портов),
+        начиная с индекса start, по одному элементу на порт. Возвращает индекс, следующий за последним записанным.
+        Общая реализация читает порты по очереди. Наследники переопределяют ее, чтобы читать все порты
+        за наименьшее кол-во транзакций шины без выделения памяти."""
+        for n_port in self._port_rng:
+            into[start + n_port] = self.read_port(n_port)
+        return start + self._port_count
+
+    # RESET DETECTION. Обнаружение сброса микросхемы (пропадание питания), смотри healthmod.
+    # кол-во байт отпечатка настройки и кол-во байт на шине при его чтении. Для переопределения в наследниках!
+    fingerprint_size = 0
+    fingerprint_cost = 0
+
+    def read_port_latch(self, n_port: int) -> int:
+        """Возвращает содержимое выходного регистра (значения выходов) порта n_port.
         Для переопределения в наследниках!"""
         raise NotImplemented
 
-    def get_port_config_raw(self) -> port_config_raw:
-        """Возвращает содержимое регистров настройки(!) текущего активного порта в сыром виде.
+    def save_state(self):
+        """Читает из микросхемы значения выходов и настройку всех портов в копию состояния драйвера.
+        Вызывать после настройки микросхемы, если она настраивалась не через этот экземпляр драйвера."""
+        if self._state_cfg is None:
+            self._state_cfg = [PortConfigRaw(None, None, None) for _ in self._port_rng]
+        for n_port in self._port_rng:
+            self.read_port_config(n_port, self._state_cfg[n_port])
+            self._state_out[n_port] = self.read_port_latch(n_port)
+
+    def restore_state(self):
+        """Записывает копию состояния в микросхему после ее сброса: сначала значения выходов, затем настройку
+        портов, чтобы выводы, переключаемые на выход, сразу получили нужные значения."""
+        if self._state_cfg is None:
+            raise ValueError("Нет копии состояния. Вызовите save_state!")
+        for n_port in self._port_rng:
+            self.write_port(n_port, self._state_out[n_port])
+            self.config_port(n_port, self._state_cfg[n_port])
+
+    def read_fingerprint(self, buf) -> bool:
+        """Читает отпечаток настройки микросхемы (fingerprint_size байт) в buf одной транзакцией шины.
+        Возвращает Ложь, если он не соответствует копии состояния драйвера (микросхема была сброшена).
         Для переопределения в наследниках!"""
         raise NotImplemented
 
+    def _update_state_cfg(self, n_port: int, config: port_config_raw):
+        """Обновляет копию настройки порта n_port полями config, не равными None"""
+        state = self._state_cfg
+        if state is None:
+            return
+        cfg = state[n_port]
+        if config.direction_reg is not None:
+            cfg.direction_reg = config.direction_reg
+        if config.input_invert_reg is not None:
+            cfg.input_invert_reg = config.input_invert_reg
+        if config.pull_reg is not None:
+            cfg.pull_reg = config.pull_reg
+
+    def snapshots(self, into):
+        """Генератор 'потока' снимков: при каждой итерации заполняет into (смотри snapshot) и возвращает его"""
+        while True:
+            self.snapshot(into)
+            yield into
+
     # Iterator methods. Методы для итератора.
     def __iter__(self):
         return self
@@ -97,11 +215,13 @@ class IOExpander(Iterator):
     class IOExpanderPin:
         """Расширитель ввода-вывода с возможностью работы с отдельными выводами/пинами портов."""
     # PIN
-    def get_pin_config(self, n_pin: int) -> pin_config:
-        """Возвращает настройку вывода n_pin текущего активного порта. Для переопределения в наследниках!"""
+    def get_pin_config(self, n_pin: int, into: PinConfig = None) -> ["pin_config", PinConfig]:
+        """Возвращает настройку вывода n_pin текущего активного порта.
+        Если into не None, то значения записываются в него и возвращается into.
+        Для переопределения в наследниках!"""
         raise NotImplemented
 
-    def set_pin_config(self, n_pin: int, cfg: pin_config):
+    def set_pin_config(self, n_pin: int, cfg: "pin_config"):
         """Устанавливает настройку вывода n_pin текущего активного порта. Для переопределения в наследниках!"""
         raise NotImplemented
 
@@ -111,4 +231,54 @@ class IOExpander(Iterator):
 
     def set_pin_value(self, n_pin: int, val: bool) -> int:
         """Устанавливает значение на выводе n_pin текущего активного порта. Для переопределения в наследниках!"""
-        raise NotImplemented
\ No newline at end of file
+        raise NotImplemented
+
+
+class ExpanderGroup:
+    """Группа расширителей ввода-вывода, значения входов всех портов которых читаются одним вызовом snapshot.
+    Итерация по группе - 'поток' снимков в одном и том же буфере, память не выделяется."""
+
+    def __init__(self, expanders: tuple, into=None):
+        """expanders - расширители ввода-вывода; into - буфер снимка (array('H') или bytearray) длиной
+        не менее len(self). Если None, то создается array('H')."""
+        self._expanders = tuple(expanders)
+        # индекс первого порта каждого расширителя в буфере снимка
+        offsets, start = [], 0
+        for exp in self._expanders:
+            offsets.append(start)
+            start += exp.get_port_count()
+        self._offsets = tuple(offsets)
+        self._size = start
+        if into is None:
+            into = array("H", (0 for _ in range(start)))
+        if len(into) < start:
+            raise ValueError(f"Размер буфера снимка {len(into)} меньше кол-ва портов {start}!")
+        self._buf = into
+
+    def __len__(self) -> int:
+        """Кол-во портов всех расширителей группы"""
+        return self._size
+
+    def get_offset(self, index: int) -> int:
+        """Возвращает индекс первого порта расширителя номер index в буфере снимка"""
+        return self._offsets[index]
+
+    @property
+    def buffer(self):
+        return self._buf
+
+    def snapshot(self, into=None, start: int = 0) -> int:
+        """Записывает значения входов всех портов всех расширителей в into (или во внутренний буфер),
+        начиная с индекса start. Возвращает индекс, следующий за последним записанным."""
+        if into is None:
+            into = self._buf
+        for exp in self._expanders:
+            start = exp.snapshot(into, start)
+        return start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.snapshot(self._buf)
+        return self._buf
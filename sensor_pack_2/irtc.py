@@ -1,6 +1,8 @@
+from array import array
 from collections import namedtuple
-from sensor_pack_2.base_sensor import check_value
+from sensor_pack_2.base_sensor import check_value_ex, is_trusted_mode, MutableRecord
 import micropython
+from sensor_pack_2.bitops import merge_bits
 
 
 @micropython.viper
@@ -14,32 +16,46 @@ def int_to_bcd(value: int) -> int:
     """преобразует int в bcd"""
     return (value//10*16)+(value%10)
 
+# таблица декодирования байта BCD: индекс - байт BCD, значение - число 0..99 или _BCD_INVALID,
+# если хотя бы одна тетрада байта больше 9. Она же служит таблицей проверки на правильность.
+_BCD_INVALID = 0xFF
+_BCD_DECODE = bytes(10 * (b >> 4) + (b & 0x0F) if (b >> 4) < 10 and (b & 0x0F) < 10 else _BCD_INVALID
+                    for b in range(256))
+# таблица кодирования: индекс - число 0..99, значение - байт BCD
+_BCD_ENCODE = bytes(((n // 10) << 4) | (n % 10) for n in range(100))
+
+
 def is_valid_bcd(bcd_value: int, tetrads: int = 1) -> bool:
     """Проверяет bcd значение на допустимые пределы. tetrads - кол-во тетрад(4 бита), занимаемых bcd значением.
     В одном байте ДВЕ тетрады! Если указать tetrads = 1, то проверит одну младшую тетраду; 2 - проверит один байт!"""
-    valid_rng = range(1, 2*4)
-    check_value(tetrads, valid_rng, f"Количество тетрад: {tetrads} находится вне допустимого диапазона: {valid_rng}")
-    tet_mask = 0x0F
-    for index in range(tetrads):
-        shift = index << 2
-        _mask = tet_mask << shift
-        _val = (bcd_value & _mask) >> shift
-        if _val > 9:
+    if not 0 < tetrads < 8:
+        raise ValueError(f"Количество тетрад: {tetrads} находится вне допустимого диапазона: {range(1, 8)}")
+    for index in range(0, tetrads, 2):
+        _byte = (bcd_value >> (index << 2)) & (0x0F if 1 == tetrads - index else 0xFF)
+        if _BCD_INVALID == _BCD_DECODE[_byte]:
             return False
     return True
 
+# кол-во дней в году до первого числа месяца (индекс 0..11) и всего дней в году (индекс 12).
+# _CUM_DAYS[0] - для обычного года, _CUM_DAYS[1] - для високосного.
+_CUM_DAYS = (array("H", (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334, 365)),
+             array("H", (0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335, 366)))
+
+
+def is_leap_year(year: int) -> bool:
+    """Возвращает Истина, если год високосный"""
+    return 0 == year % 4 and (0 != year % 100 or 0 == year % 400)
+
+
 @micropython.native
 def get_day_of_year(year: int, month: int, day: int, check: bool = False) -> int:
     """Возвращает номер дня в году 1..366.
     year - год, month - месяц (1..12), day - день месяца(1..31).
     Если check is True, то входные параметры проверяются на правильность!"""
     if check:
-        if not year in range(2000, 2100) or not month in range(1, 13) or not day in range(1, 32):
+        if not 2000 <= year < 2100 or not 1 <= month <= 12 or not 1 <= day <= 31:
             raise ValueError(f"Неверное значение или года: {year} или месяца: {month} или дня: {day}!")
-    n1 = 275 * month // 9
-    n2 = (month + 9) // 12
-    n3 = (1 + (year - 4 * year // 4 + 2) // 3)
-    return n1 - (n2 * n3) + day - 30
+    return _CUM_DAYS[is_leap_year(year)][month - 1] + day
 
 
 # поля кортежа времени тревоги/будильника. чтобы отключить значение, установите его в None!
@@ -59,36 +75,28 @@ rtc_alarm_time = namedtuple("rtc_alarm_time", _alarm_time_fields)
 _time_fields = "year month day hour min sec day_of_week day_of_year"
 rtc_time = namedtuple("rtc_time", _time_fields)
 
+
+class RtcTime(MutableRecord):
+    """Изменяемый аналог rtc_time для параметра into метода get_time"""
+    __slots__ = ("year", "month", "day", "hour", "min", "sec", "day_of_week", "day_of_year")
+
 def check_alarm_time(_time: rtc_alarm_time, date_bit: int = 7):
     """Проверяет время тревоги на правильность. date_bit - номер бита-признака дня месяца.
     Если в поле date_day этот бит в 1, то это день месяца, иначе день недели!
     Время в 24 часовом формате!"""
-    item = _time.min
-    if not item is None:
-        rng = range(60)
-        str_msg = f"Значение {item} вне диапазона {rng}!"
-        check_value(item, rng, str_msg)
-
-    item = _time.hour
-    if not item is None:
-        rng = range(24)
-        str_msg = f"Значение {item} вне диапазона {rng}!"
-        check_value(item, rng, str_msg)
+    check_value_ex(_time.min, range(60), "min")
+    check_value_ex(_time.hour, range(24), "hour")
 
     item = _time.date_day
     if not item is None:
         msk = 1 << date_bit
         if msk & item:  # день месяца - date
             # print("день месяца!")
-            rng = range(1, 32)
-            str_msg = f"Значение {item} вне диапазона {rng}!"
-            if not item - msk in rng:
-                raise ValueError(str_msg)
+            if not is_trusted_mode() and not item - msk in range(1, 32):
+                raise ValueError(f"Значение {item} вне диапазона {range(1, 32)}!")
         else:  # день недели 0..6
             # print("день недели!")
-            rng = range(7)
-            str_msg = f"Значение {item} вне диапазона {rng}!"
-            check_value(item, rng, str_msg)
+            check_value_ex(item, range(7), "date_day")
 
 def get_bit_mask_gen(bit_numbers: tuple[int,...], flags: tuple[[int, bool],...]):
     """Возвращает генератор битовых маск для битовых операций.
@@ -105,14 +113,96 @@ def get_bit_mask_gen(bit_numbers: tuple[int,...], flags: tuple[[int, bool],...])
 def change_bit_by_flags(source: int, bit_numbers: [range, tuple[int,...]], flags: tuple[[int, bool],...]) -> int:
     """Изменяет биты с номерами bit_numbers в source в соответствии со значениями флагов flags.
     Возвращает результат, как int"""
-    bit_mask_gen = get_bit_mask_gen(bit_numbers, flags)
-    _src = source
-    for mask in bit_mask_gen:
-        if mask < 0:
-            _src &= mask  # обнуляю бит
-        else:
-            _src |= mask  # устанавливаю бит в 1
-    return _src
+    mask = value = 0
+    for index in range(len(bit_numbers)):
+        flag = flags[index]
+        if flag is None:    # пропускаю флаги содержащие None
+            continue
+        bit = 1 << bit_numbers[index]
+        mask |= bit
+        if flag:
+            value |= bit
+    return merge_bits(source, value, mask)
+
+
+class BCDTimeCodec:
+    """Преобразование всего буфера 'сырого' времени RTC (смотри IRTC.read_raw_time) в rtc_time за один проход,
+    с проверкой на правильность, и обратно (IRTC.write_raw_time). Используются таблицы из 256/100 элементов.
+    Время в 24 часовом формате!"""
+
+    def __init__(self, layout: tuple, year_base: int = 2000):
+        """layout - кортеж описаний байт буфера, по порядку, в виде пар (имя поля rtc_time, маска значащих бит).
+        Если имя поля None, то байт пропускается. Например, для DS3231:
+        (("sec", 0x7F), ("min", 0x7F), ("hour", 0x3F), ("day_of_week", 0x07), ("day", 0x3F), ("month", 0x1F),
+        ("year", 0xFF)).
+        year_base - значение года, соответствующее нулю в байте года."""
+        fields = rtc_time._fields
+        self._indexes = bytes(0xFF if name is None else fields.index(name) for name, _ in layout)
+        self._masks = bytes(mask for _, mask in layout)
+        self._year_base = year_base
+        self._year_index = fields.index("year")
+        # year_base прибавляется, только если байт года есть в буфере
+        self._has_year = self._year_index in self._indexes
+        # day_of_year вычисляется, только если в буфере есть байты месяца и дня
+        self._has_date = fields.index("month") in self._indexes and fields.index("day") in self._indexes
+        self._values = [0 for _ in range(len(fields))]
+
+    def __len__(self) -> int:
+        """Размер 'сырого' буфера в байтах"""
+        return len(self._masks)
+
+    def decode(self, buf, check: bool = True, into: RtcTime = None) -> [rtc_time, RtcTime, None]:
+        """Преобразует содержимое буфера buf в rtc_time. Поле day_of_year вычисляется, если в буфере есть
+        месяц и день, иначе оно равно 0.
+        Если check в Истина и в буфере есть неверное BCD значение, месяц вне 1..12 или день вне 1..31,
+        то возвращает None. Если check в Ложь, то при таких месяце или дне day_of_year равно 0.
+        Если into не None, то значения записываются в него и возвращается into."""
+        vals, indexes, masks = self._values, self._indexes, self._masks
+        decode = _BCD_DECODE
+        # поля, которых нет в буфере, равны нулю, а не значениям предыдущего вызова
+        for i in range(len(vals)):
+            vals[i] = 0
+        for i in range(len(masks)):
+            idx = indexes[i]
+            if 0xFF == idx:
+                continue
+            val = decode[buf[i] & masks[i]]
+            if check and _BCD_INVALID == val:
+                return None
+            vals[idx] = val
+        y_idx = self._year_index
+        if self._has_year:
+            vals[y_idx] += self._year_base
+        if self._has_date:
+            month, day = vals[1], vals[2]
+            if 1 <= month <= 12 and 1 <= day <= 31:
+                # поле day_of_year всегда последнее
+                vals[-1] = get_day_of_year(vals[y_idx], month, day)
+            elif check:
+                return None
+        if into is None:
+            return rtc_time(*vals)
+        names = RtcTime.__slots__
+        for i in range(len(names)):
+            setattr(into, names[i], vals[i])
+        return into
+
+    def encode_into(self, src: rtc_time, buf):
+        """Записывает src в буфер buf (bytearray) в BCD, на место значащих бит. Остальные биты буфера
+        (например, флаги, хранящиеся в регистрах времени) не изменяются. Возвращает buf."""
+        indexes, masks = self._indexes, self._masks
+        encode = _BCD_ENCODE
+        y_idx = self._year_index
+        for i in range(len(masks)):
+            idx = indexes[i]
+            if 0xFF == idx:
+                continue
+            val = src[idx]
+            if idx == y_idx:
+                val -= self._year_base
+            msk = masks[i]
+            buf[i] = merge_bits(buf[i], encode[val], msk)
+        return buf
 
 
 class IRTC:
@@ -138,10 +228,22 @@ class IRTC:
         Для переопределения в классе-наследнике!"""
         raise NotImplemented
 
-    def get_time(self) -> [None, rtc_time]:
-        """возвращает время"""
+    def raw_to_time_into(self, buf: bytearray, into: RtcTime) -> RtcTime:
+        """То же, что и raw_to_time, но значения записываются в into, который и возвращается.
+        Эта реализация создает промежуточный кортеж! Переопределите ее в классе-наследнике,
+        например, с помощью BCDTimeCodec.decode."""
+        t = self.raw_to_time(buf)
+        names = RtcTime.__slots__
+        for i in range(len(names)):
+            setattr(into, names[i], t[i])
+        return into
+
+    def get_time(self, into: RtcTime = None) -> [None, rtc_time, RtcTime]:
+        """возвращает время. Если into не None, то значения записываются в него и возвращается into."""
         _buf = self.read_raw_time()
-        return self.raw_to_time(_buf)
+        if into is None:
+            return self.raw_to_time(_buf)
+        return self.raw_to_time_into(_buf, into)
 
     def set_time(self, value: rtc_time):
         """устанавливает время"""
@@ -215,7 +317,7 @@ class IRTCwAlarms(IRTC):
         В соответствии с документацией на RTC. Обычно это бит номер семь(7)!
         Для переопределения в классе - наследнике!"""
         rng = range(6, 8)
-        check_value(bit_number, rng, f"Номер бита {bit_number} вне диапазона {rng}!")
+        check_value_ex(bit_number, rng, "bit_number")
         self._alarm_dis_bit = bit_number
 
     def get_bit_disable(self) -> int:
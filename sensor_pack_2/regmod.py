@@ -4,7 +4,7 @@
 """представление аппаратного регистра устройства"""
 
 # from sensor_pack_2 import bus_service
-from sensor_pack_2.base_sensor import DeviceEx, get_error_str, check_value
+from sensor_pack_2.base_sensor import DeviceEx, check_value_ex
 from sensor_pack_2.bitfield import BitFields
 
 # 24.04.2024 было-> address: int; стало-> address: [int, None]. Смотри def __init__(...
@@ -24,7 +24,7 @@ class BaseRegistry:
         address - адрес регистра в памяти устройства.
         fields - битовые поля регистра.
         byte_len - разрядность регистра в байтах!"""
-        check_value(byte_len, range(1, 3), get_error_str('byte_len', byte_len, range(1, 3)))
+        check_value_ex(byte_len, range(1, 3), 'byte_len')
         self._device = device
         self._address = address
         self._fields = fields
@@ -33,13 +33,12 @@ class BaseRegistry:
         # проверка битового диапазона поля
         # str_err = f"Неверный параметр битового поля!"
         _k = 8 * self._byte_len
+        _rng = range(_k)
         for field in fields:
-            check_value(field.position.start, range(_k),
-                        get_error_str('field.position.start', field.position.start, range(_k)))
-            check_value(field.position.stop - 1, range(_k),
-                        get_error_str('field.position.stop', field.position.stop, range(_k)))
-            check_value(field.position.step, range(1, 2),
-                        get_error_str('field.position.step', field.position.step, range(1, 2)))  # шаг только единица!
+            pos = field.position
+            check_value_ex(pos.start, _rng, 'field.position.start')
+            check_value_ex(pos.stop - 1, _rng, 'field.position.stop')
+            check_value_ex(pos.step, range(1, 2), 'field.position.step')  # шаг только единица!
         #
         self._value = 0  # значение, считанное из регистра
 
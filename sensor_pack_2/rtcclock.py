@@ -0,0 +1,114 @@
+# MicroPython
+# MIT license
+"""Кэширование времени RTC. Время считывается из чипа RTC редко, а между чтениями вычисляется по time.ticks_ms.
+Cached RTC time interpolated with time.ticks_ms between bus reads."""
+
+import time
+from sensor_pack_2.irtc import IRTC, rtc_time
+from sensor_pack_2.rtcdate import time_to_epoch, epoch_to_time
+
+# наибольший интервал между чтениями времени из RTC, мс.
+# Разность значений time.ticks_ms верна только на интервале, меньшем половины периода счетчика!
+_max_resync_interval_ms = 24 * 3_600_000
+# наибольшее время ожидания смены секунды в RTC при синхронизации с выравниванием, мс
+_align_timeout_ms = 1100
+
+
+class CachedClock:
+    """Часы, которые читают время из RTC один раз за интервал resync_interval_ms, а в промежутках
+    вычисляют время по счетчику миллисекунд MCU. Получение времени не требует обмена по шине.
+    При каждом чтении RTC вычисляется расхождение (drift) счетчика MCU и RTC. Если оно больше max_drift_ms,
+    интервал синхронизации уменьшается вдвое (не менее min_resync_interval_ms), иначе увеличивается вдвое
+    (не более resync_interval_ms)."""
+
+    def __init__(self, rtc: IRTC, resync_interval_ms: int = 60_000, max_drift_ms: int = 2000,
+                 min_resync_interval_ms: int = 1000, align: bool = False):
+        """rtc - часы реального времени;
+        resync_interval_ms - интервал чтения времени из RTC, мс;
+        max_drift_ms - допустимое расхождение времени MCU и RTC, мс;
+        min_resync_interval_ms - наименьший интервал чтения времени из RTC, мс;
+        align - если Истина, то при синхронизации ожидается смена секунды в RTC. Это увеличивает точность
+        до нескольких мс, но требует многократного чтения RTC. Иначе погрешность до одной секунды!
+        Если секунда не сменилась за 1.1 с (генератор RTC остановлен, например, после разряда батареи),
+        то синхронизация выполняется без выравнивания, а rtc_running становится Ложь."""
+        rng = range(1, 1 + _max_resync_interval_ms)
+        if resync_interval_ms not in rng or min_resync_interval_ms not in rng:
+            raise ValueError(f"Интервал синхронизации вне диапазона 1..{_max_resync_interval_ms} мс!")
+        self._rtc = rtc
+        self._max_interval = resync_interval_ms
+        self._min_interval = min(min_resync_interval_ms, resync_interval_ms)
+        self._interval = resync_interval_ms
+        self._max_drift = max_drift_ms
+        self._align = align
+        # время в секундах от начала эпохи, прочитанное из RTC, и значение счетчика MCU в момент чтения
+        self._base_epoch = None
+        self._base_ticks = 0
+        self._last_drift = 0
+        self._running = True
+        self.sync()
+
+    def _read_epoch(self) -> int:
+        """Читает время из RTC и возвращает его в секундах от начала эпохи"""
+        return time_to_epoch(self._rtc.get_time())
+
+    def sync(self):
+        """Читает время из RTC и запоминает значение счетчика MCU"""
+        epoch = self._read_epoch()
+        if self._align:
+            prev = epoch
+            start = time.ticks_ms()
+            while epoch == prev:
+                if time.ticks_diff(time.ticks_ms(), start) > _align_timeout_ms:
+                    break   # время в RTC не идет
+                time.sleep_ms(5)
+                epoch = self._read_epoch()
+            self._running = epoch != prev
+        ticks = time.ticks_ms()
+        if self._base_epoch is not None:
+            predicted = 1000 * self._base_epoch + time.ticks_diff(ticks, self._base_ticks)
+            self._last_drift = 1000 * epoch - predicted
+            if abs(self._last_drift) > self._max_drift:
+                self._interval = max(self._min_interval, self._interval >> 1)
+            else:
+                self._interval = min(self._max_interval, self._interval << 1)
+        self._base_epoch = epoch
+        self._base_ticks = ticks
+
+    def _elapsed_ms(self) -> int:
+        """Возвращает время, мс, прошедшее с последней синхронизации. При необходимости синхронизирует часы."""
+        elapsed = time.ticks_diff(time.ticks_ms(), self._base_ticks)
+        if elapsed >= self._interval:
+            self.sync()
+            elapsed = 0
+        return elapsed
+
+    @property
+    def last_drift_ms(self) -> int:
+        """Расхождение времени RTC и MCU, мс, обнаруженное при последней синхронизации.
+        Положительное значение - часы MCU отстают"""
+        return self._last_drift
+
+    @property
+    def rtc_running(self) -> bool:
+        """Ложь, если при последней синхронизации с выравниванием время в RTC не изменилось за 1.1 с"""
+        return self._running
+
+    @property
+    def resync_interval_ms(self) -> int:
+        """Текущий интервал чтения времени из RTC, мс"""
+        return self._interval
+
+    def epoch(self) -> int:
+        """Возвращает время в секундах от начала эпохи (смотри модуль rtcdate)"""
+        elapsed = self._elapsed_ms()
+        return self._base_epoch + elapsed // 1000
+
+    def epoch_ms(self) -> int:
+        """Возвращает время в миллисекундах от начала эпохи.
+        Внимание! Значение не помещается в 'малое' целое MicroPython и под него выделяется память."""
+        elapsed = self._elapsed_ms()
+        return 1000 * self._base_epoch + elapsed
+
+    def now(self) -> rtc_time:
+        """Возвращает текущее время. Поле day_of_week: 0 - понедельник!"""
+        return epoch_to_time(self.epoch())
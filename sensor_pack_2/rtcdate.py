@@ -0,0 +1,75 @@
+# MicroPython
+# MIT license
+"""Календарная арифметика без обращения к RTC: преобразование rtc_time в секунды от начала эпохи и обратно,
+день недели, пакетное преобразование меток времени. Начало эпохи: 2000-01-01 00:00:00.
+Date arithmetic: rtc_time to/from epoch seconds, day of week, block conversion. Epoch: 2000-01-01 00:00:00."""
+
+from array import array
+from sensor_pack_2.irtc import rtc_time, is_leap_year, _CUM_DAYS
+
+EPOCH_YEAR = 2000
+SECONDS_PER_DAY = 86_400
+
+
+def days_before_year(year: int) -> int:
+    """Возвращает кол-во дней от начала эпохи до 1 января года year (year >= EPOCH_YEAR)"""
+    dy = year - EPOCH_YEAR
+    # EPOCH_YEAR делится на 400, поэтому он високосный
+    return 365 * dy + (dy + 3) // 4 - (dy + 99) // 100 + (dy + 399) // 400
+
+
+def date_to_days(year: int, month: int, day: int) -> int:
+    """Возвращает кол-во дней от начала эпохи до даты"""
+    return days_before_year(year) + _CUM_DAYS[is_leap_year(year)][month - 1] + day - 1
+
+
+def get_day_of_week(year: int, month: int, day: int) -> int:
+    """Возвращает день недели 0..6, 0 - понедельник (как в time.localtime)"""
+    # 2000-01-01 - суббота (5)
+    return (date_to_days(year, month, day) + 5) % 7
+
+
+def time_to_epoch(t: rtc_time) -> int:
+    """Возвращает время t в секундах от начала эпохи. Поля day_of_week и day_of_year не используются"""
+    return (date_to_days(t.year, t.month, t.day) * SECONDS_PER_DAY
+            + 3600 * t.hour + 60 * t.min + t.sec)
+
+
+def epoch_to_time(seconds: int) -> rtc_time:
+    """Возвращает rtc_time по времени в секундах от начала эпохи. day_of_week: 0 - понедельник"""
+    days, sec = divmod(seconds, SECONDS_PER_DAY)
+    year = EPOCH_YEAR + days // 366     # оценка снизу
+    while days_before_year(1 + year) <= days:
+        year += 1
+    day_of_year = days - days_before_year(year)   # 0..365
+    cum = _CUM_DAYS[is_leap_year(year)]
+    month = 1
+    while cum[month] <= day_of_year:
+        month += 1
+    hour, sec = divmod(sec, 3600)
+    minute, sec = divmod(sec, 60)
+    return rtc_time(year=year, month=month, day=1 + day_of_year - cum[month - 1], hour=hour, min=minute, sec=sec,
+                    day_of_week=(days + 5) % 7, day_of_year=1 + day_of_year)
+
+
+def times_to_epoch(times, dst: array = None) -> array:
+    """Преобразует последовательность rtc_time в секунды от начала эпохи. Результат записывается в dst
+    (array('L') длиной не менее len(times)), который и возвращается. Если dst is None, он создается.
+    Кол-во дней от начала эпохи до начала года вычисляется один раз для каждого года."""
+    if dst is None:
+        dst = array("L", (0 for _ in range(len(times))))
+    last_year, year_days, cum = None, 0, None
+    for i, t in enumerate(times):
+        year = t.year
+        if year != last_year:
+            last_year = year
+            year_days = days_before_year(year)
+            cum = _CUM_DAYS[is_leap_year(year)]
+        days = year_days + cum[t.month - 1] + t.day - 1
+        dst[i] = days * SECONDS_PER_DAY + 3600 * t.hour + 60 * t.min + t.sec
+    return dst
+
+
+def epochs_to_times(seconds) -> list:
+    """Преобразует последовательность значений времени в секундах от начала эпохи в список rtc_time"""
+    return [epoch_to_time(sec) for sec in seconds]
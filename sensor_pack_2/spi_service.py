@@ -0,0 +1,117 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""MicroPython модуль адаптера шины SPI. Выделен из bus_service для уменьшения времени загрузки драйверов
+I2C устройств. Доступен также, как bus_service.SpiAdapter."""
+
+from sensor_pack_2.bus_service import BusAdapter
+
+
+class SpiAdapter(BusAdapter):
+    """Адаптер шины SPI"""
+    def __init__(self, bus: "SPI", data_mode: "Pin" = None):
+        """Параметр data_mode представляет собой вывод MCU, который используется для установки флага,
+        что посылка является данными (high) или командой (low). Например это необходимо при обмене с ILI9481."""
+        super().__init__(bus)
+        # вывод MCU для режима данных
+        self.data_mode_pin = data_mode
+        # использовать ли вывод MCU для режима данных (Истина) или команд (Ложь)
+        self.use_data_mode_pin = False
+        # флаг для методов write.. . Если Истина, то data_mode (Pin) будет установлена в Истина, иначе в Ложь!
+        # flag for write.. methods. If True, then data_mode (Pin) will be set to True, otherwise to False!
+        self.data_packet = False
+        # индекс/номер байта в пересылаемом устройству по шину буферу, в котором находится адрес регистра устройства!
+        self._address_index = 0
+        # ссылка на функцию подготовки содержимого буфера перед его пересылкой в устройство!
+        # вида prepare(buf:bytearray, address_index:int) -> bytes: ...
+        # или None
+        self._prepare_before_send_ref = None
+
+    @property
+    def prepare_func(self):
+        """Возвращает ссылку на функцию обработки буфера перед отправкой его по шине"""
+        return self._prepare_before_send_ref
+
+    @prepare_func.setter
+    def prepare_func(self, value):
+        """Устанавливает ссылку на функцию обработки буфера перед отправкой его по шине"""
+        self._prepare_before_send_ref = value
+
+    def _call_prepare(self, buf: bytearray):
+        ref = self._prepare_before_send_ref
+        if ref is not None:
+            ref(buf, self._address_index)
+
+    def read(self, device_addr: "Pin", n_bytes: int) -> bytes:
+        """Read a number of bytes specified by n_bytes while continuously writing the single byte given by write.
+        Returns a bytes object with the data that was read."""
+        try:
+            device_addr.value(0)
+            return self.bus.read(n_bytes)
+        finally:
+            device_addr.value(1)
+
+    def read_to_buf(self, device_addr: "Pin", buf) -> bytes:
+        """Читает из устройства на шине с адресом device_addr в буфер buf количество байт, равное длине(len) буфера!"""
+        try:
+            device_addr.value(0)
+            self.bus.readinto(buf, 0x00)
+            return buf
+        finally:
+            device_addr.value(1)
+
+    def write(self, device_addr: "Pin", buf: bytes):
+        """Параметр data_packet представляет собой признак того, что посылка является данными (high) или командой (low).
+        Например это необходимо при обмене ILI9481.
+        Write the bytes contained in buf. Returns None.
+        The data_packet parameter is an indication that the package is data (high) or command (low).
+         For example, this is necessary when exchanging ILI9481."""
+        try:
+            device_addr.value(0)   # chip select
+            if self.use_data_mode_pin and self.data_mode_pin:
+                self.data_mode_pin.value(self.data_packet)
+            return self.bus.write(buf)
+        finally:
+            device_addr.value(1)
+
+    def write_and_read(self, device_addr: "Pin", wr_buf: bytes, rd_buf: bytes):
+        """Одновременная запись и чтение байт.
+        Записывает байты из write_buf и читает в read_buf. Буферы могут быть одинаковыми или разными,
+        но оба буфера должны иметь одинаковую длину?
+        Возвращает None.
+        Примечание: на WiPy эта функция возвращает количество записанных байтов.
+
+        Параметр data_packet представляет собой признак того, что посылка является данными (high) или командой (low).
+        Например это необходимо при обмене ILI9481.
+        Расширение возможностей базового класса.
+        Write the bytes from write_buf while reading into read_buf. The buffers can be the same or different,
+        but both buffers must have the same length. Returns None.
+        The data_packet parameter is an indication that the package is data (high) or command (low).
+         For example, this is necessary when exchanging ILI9481."""
+        try:
+            device_addr.value(0)   # chip select
+            if self.use_data_mode_pin and self.data_mode_pin:
+                self.data_mode_pin.value(self.data_packet)
+            return self.bus.write_readinto(wr_buf, rd_buf)
+        finally:
+            device_addr.value(1)
+
+    def read_buf_from_memory(self, device_addr: "Pin", mem_addr, buf, address_size: int):
+        """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
+        Количество считываемых байт определяется длинной буфера buf."""
+        try:
+            device_addr.value(0)  # chip select
+            # пока нет реализации!!!
+            raise NotImplementedError
+        finally:
+            device_addr.value(1)
+
+    def write_buf_to_memory(self, device_addr: "Pin", mem_addr, buf):
+        try:
+            device_addr.value(0)  # chip select
+            # подготовка буфера к пересылке
+            self._call_prepare(buf)
+            # пока нет реализации!!!
+            raise NotImplementedError
+        finally:
+            device_addr.value(1)
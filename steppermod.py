@@ -0,0 +1,227 @@
+# MicroPython
+# MIT license
+"""Управление униполярными шаговыми двигателями через выходы расширителей ввода-вывода (XCA9555, MCP23x17 и т. д.).
+Unipolar stepper motors driven through I/O expander outputs with precomputed phase and acceleration ramp tables."""
+
+from array import array
+from sensor_pack_2.ioexpander import IOExpander
+from sensor_pack_2.bitops import bit_mask, merge_bits
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+# таблицы фаз (обмотки A, B, A', B' - биты 0..3 полубайта)
+# полный шаг, две обмотки включены одновременно
+FULL_STEP = (0b0011, 0b0110, 0b1100, 0b1001)
+# полный шаг, одна обмотка (wave drive)
+WAVE_STEP = (0b0001, 0b0010, 0b0100, 0b1000)
+# полушаг
+HALF_STEP = (0b0001, 0b0011, 0b0010, 0b0110, 0b0100, 0b1100, 0b1000, 0b1001)
+
+
+def make_ramp_table(tick_hz: int, max_speed: int, accel: int) -> array:
+    """Возвращает таблицу интервалов между шагами в тиках таймера (array('H')) для разгона с ускорением accel
+    (шаг/с²) до скорости max_speed (шаг/с). tick_hz - частота тиков таймера, Гц.
+    Интервалы вычисляются по рекуррентной формуле D. Austin (Generate stepper-motor speed profiles in real time):
+    c0 = 0.676 * tick_hz * sqrt(2 / accel); cn = c(n-1) - 2 * c(n-1) / (4 * n + 1)."""
+    if max_speed < 1 or accel < 1 or max_speed > tick_hz:
+        raise ValueError(f"Неверные параметры разгона: {max_speed} шаг/с, {accel} шаг/с², {tick_hz} Гц")
+    c_min = tick_hz / max_speed
+    c = max(c_min, 0.676 * tick_hz * (2 / accel) ** 0.5)
+    ramp = [min(65535, round(c))]
+    n = 1
+    while c > c_min:
+        c = max(c_min, c - 2 * c / (4 * n + 1))
+        ramp.append(min(65535, round(c)))
+        n += 1
+    return array("H", ramp)
+
+
+class Stepper:
+    """Шаговый двигатель, подключенный к полубайту (четырем выводам) порта расширителя ввода-вывода.
+    Таблица фаз заранее сдвинута в позицию полубайта. Создается методом StepperGroup.add_motor."""
+
+    def __init__(self, port_index: int, nibble: int, phases: tuple, ramp: array):
+        shift = 4 * nibble
+        self.port_index = port_index
+        self.mask = bit_mask(shift, 4)
+        self.table = array("H", (ph << shift for ph in phases))
+        self.ramp = ramp
+        self.phase = 0
+        self.position = 0
+        self.target = 0
+        # индекс текущего интервала в таблице разгона
+        self.ramp_index = 0
+        # тиков до следующего шага, 0 - двигатель стоит
+        self.countdown = 0
+        self.direction = 1
+
+    def is_moving(self) -> bool:
+        return self.countdown > 0
+
+    def _start(self):
+        if self.countdown or self.target == self.position:
+            return
+        self.direction = 1 if self.target > self.position else -1
+        self.ramp_index = 0
+        self.countdown = self.ramp[0]
+
+    def move_to(self, position: int):
+        """Перемещение в абсолютную позицию, шагов. Если двигатель движется в противоположную сторону,
+        он сначала тормозит."""
+        self.target = position
+        self._start()
+
+    def move(self, steps: int):
+        """Перемещение на steps шагов относительно текущей цели"""
+        self.move_to(self.target + steps)
+
+    def stop(self):
+        """Плавная остановка с торможением по таблице разгона"""
+        if self.countdown:
+            self.target = self.position + self.direction * self.ramp_index
+
+    def step(self) -> bool:
+        """Выполняет шаг: изменяет позицию, фазу и интервал до следующего шага (вызывается StepperGroup.tick,
+        когда интервал истек). Возвращает Истина, если двигатель продолжает движение"""
+        direction = self.direction
+        self.position += direction
+        self.phase = (self.phase + direction) % len(self.table)
+        remaining = (self.target - self.position) * direction
+        index = self.ramp_index
+        if remaining <= 0 and index == 0:
+            if remaining:
+                # цель позади: разгон в обратную сторону
+                self.direction = -direction
+                self.countdown = self.ramp[0]
+                return True
+            self.countdown = 0
+            return False
+        if remaining <= index:
+            # торможение: осталось столько шагов, сколько нужно для остановки (или цель позади)
+            index -= 1
+        elif index < len(self.ramp) - 1:
+            index += 1
+        self.ramp_index = index
+        self.countdown = self.ramp[index]
+        return True
+
+
+class StepperGroup:
+    """Группа шаговых двигателей на выходах одного расширителя ввода-вывода.
+    Тики таймера с частотой tick_hz отсчитывают интервалы между шагами. Изменяется только полубайт двигателя
+    в кэше выходов порта (без чтения порта по шине), а все изменения порта за тик записываются одной записью,
+    поэтому несколько двигателей на одном порту не увеличивают обмен по шине. В тике память не выделяется."""
+
+    def __init__(self, expander: IOExpander, ports: tuple = (0,), tick_hz: int = 2000, initial: tuple = None):
+        """expander - расширитель ввода-вывода. Выводы портов ports должны быть настроены на выход;
+        ports - номера портов расширителя, к которым подключены двигатели;
+        tick_hz - частота тиков таймера, Гц. Определяет наибольшую скорость двигателей;
+        initial - значения выходов портов ports. Если None, то читаются из выходных регистров расширителя.
+        В порт записывается весь его выходной регистр, поэтому выводы, не занятые двигателями, сохраняют
+        эти значения."""
+        for n_port in ports:
+            expander._check_port_numb(n_port)
+        self._expander = expander
+        self._ports = ports
+        self._tick_hz = tick_hz
+        self._nibbles = expander.get_port_info().width // 4
+        # кэш выходов портов
+        if initial is None:
+            initial = [expander.read_port_latch(n_port) for n_port in ports]
+        elif len(initial) != len(ports):
+            raise ValueError(f"Кол-во начальных значений {len(initial)} не равно кол-ву портов {len(ports)}")
+        self._latch = array("H", initial)
+        self._motors = []
+        self._timer = None
+        self._tick_ref = self.tick
+
+    @property
+    def tick_hz(self) -> int:
+        return self._tick_hz
+
+    def add_motor(self, port_index: int, nibble: int, phases: tuple = FULL_STEP, max_speed: int = 500,
+                  accel: int = 1000, ramp: array = None) -> Stepper:
+        """Добавляет двигатель. port_index - индекс порта в ports; nibble - номер полубайта порта (0 - P0..P3,
+        1 - P4..P7 и т. д.); phases - таблица фаз (FULL_STEP, WAVE_STEP, HALF_STEP);
+        max_speed - наибольшая скорость, шаг/с; accel - ускорение, шаг/с²;
+        ramp - таблица разгона (make_ramp_table). Если None, то она вычисляется по max_speed и accel.
+        Двигатели с одинаковыми параметрами могут использовать одну таблицу разгона."""
+        if not 0 <= port_index < len(self._ports):
+            raise ValueError(f"Неверный индекс порта: {port_index}")
+        if not 0 <= nibble < self._nibbles:
+            raise ValueError(f"Неверный номер полубайта: {nibble}")
+        motor = Stepper(port_index, nibble, phases, ramp or make_ramp_table(self._tick_hz, max_speed, accel))
+        for other in self._motors:
+            if other.port_index == port_index and other.mask == motor.mask:
+                raise ValueError(f"Полубайт {nibble} порта {self._ports[port_index]} уже занят!")
+        self._motors.append(motor)
+        # обмотки двигателя запитываются в начальной фазе
+        self._latch[port_index] = merge_bits(self._latch[port_index], motor.table[0], motor.mask)
+        self._write(1 << port_index)
+        return motor
+
+    def set_port_bits(self, port_index: int, value: int, mask: int):
+        """Изменяет биты mask выходов порта с индексом port_index, не занятые двигателями (например, сигнал
+        ENABLE драйвера), через кэш выходов группы, чтобы tick не перезаписал их прежними значениями"""
+        self._latch[port_index] = merge_bits(self._latch[port_index], value, mask)
+        self._write(1 << port_index)
+
+    def release(self, motor: Stepper):
+        """Обесточивает обмотки остановленного двигателя"""
+        index = motor.port_index
+        self._latch[index] = merge_bits(self._latch[index], 0, motor.mask)
+        self._write(1 << index)
+
+    def _write(self, dirty: int):
+        """Записывает в порты, отмеченные битами dirty, значения из кэша выходов"""
+        exp, latch, ports = self._expander, self._latch, self._ports
+        index = 0
+        while dirty:
+            if dirty & 1:
+                exp.write_port(ports[index], latch[index])
+            dirty >>= 1
+            index += 1
+
+    def is_moving(self) -> bool:
+        """Возвращает Истина, если хотя бы один двигатель движется"""
+        for motor in self._motors:
+            if motor.countdown:
+                return True
+        return False
+
+    def tick(self, _=None):
+        """Обработка тика таймера. Вызывается с частотой tick_hz (таймером или в цикле программы)"""
+        latch = self._latch
+        dirty = 0
+        for motor in self._motors:
+            cnt = motor.countdown
+            if not cnt:
+                continue
+            cnt -= 1
+            if cnt:
+                motor.countdown = cnt
+                continue
+            motor.step()
+            index = motor.port_index
+            latch[index] = merge_bits(latch[index], motor.table[motor.phase], motor.mask)
+            dirty |= 1 << index
+        if dirty:
+            self._write(dirty)
+
+    def _on_timer(self, timer):
+        micropython.schedule(self._tick_ref, None)
+
+    def start(self, timer):
+        """Запуск тиков по таймеру. timer - экземпляр machine.Timer"""
+        self.stop()
+        self._timer = timer
+        timer.init(freq=self._tick_hz, mode=timer.PERIODIC, callback=self._on_timer)
+
+    def stop(self):
+        """Остановка таймера. Двигатели останавливаются без торможения!"""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
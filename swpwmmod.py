@@ -0,0 +1,195 @@
+# MicroPython
+# MIT license
+"""Программная ШИМ (PWM) на выходах расширителей ввода-вывода, не имеющих аппаратной ШИМ.
+Software PWM on I/O expander outputs batching pins that switch together into one port write."""
+
+from array import array
+from sensor_pack_2.ioexpander import IOExpander
+from sensor_pack_2.bitops import bit_mask, merge_bits
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+# кол-во бит на шине I2C, кроме байт данных: START, STOP и запас на паузы между посылками
+_I2C_FRAME_OVERHEAD_BITS = 2
+
+
+class SoftPWM:
+    """Программная ШИМ на нескольких выводах одного или нескольких портов расширителя ввода-вывода.
+    Период ШИМ делится на resolution тиков. В начале периода все каналы с ненулевым коэффициентом заполнения
+    включаются, а затем выключаются в тик, равный их коэффициенту заполнения. Таблица событий (тик, порт, значение)
+    вычисляется заранее, только при изменении коэффициентов заполнения: выводы одного порта с одинаковым
+    коэффициентом заполнения переключаются одной записью в порт, а тики без событий не требуют обмена по шине.
+    Номер канала: индекс порта в ports * ширина порта + номер вывода в порту."""
+
+    def __init__(self, expander: IOExpander, ports: tuple = (0,), channels: tuple = None, resolution: int = 100,
+                 rest_value: int = 0, active_low: bool = False, write_bytes: int = 3):
+        """expander - расширитель ввода-вывода;
+        ports - номера портов расширителя, на выводах которых работает ШИМ;
+        channels - номера каналов ШИМ. Если None, то все выводы портов ports;
+        resolution - кол-во тиков в периоде ШИМ (коэффициент заполнения 0..resolution);
+        rest_value - значение выводов портов, не являющихся каналами ШИМ. Записывается как есть, без инверсии
+        (для входов PCF8574 - единицы);
+        active_low - если Истина, то канал 'включен' при НУЛЕ на выводе (нагрузка между питанием и выводом,
+        как у PCF8574). Инвертируются только выводы-каналы ШИМ;
+        write_bytes - кол-во байт, передаваемых по шине при записи в порт, включая байт адреса (2 для PCF8574,
+        3 для XCA9555 и MCP23x17). Используется только методом max_frequency."""
+        for n_port in ports:
+            expander._check_port_numb(n_port)
+        if not 1 < resolution < 65536:
+            raise ValueError(f"Неверное кол-во тиков в периоде ШИМ: {resolution}")
+        width = expander.get_port_info().width
+        port_mask = bit_mask(0, width)
+        if channels is None:
+            channels = range(width * len(ports))
+        self._expander = expander
+        self._ports = ports
+        self._width = width
+        self._resolution = resolution
+        self._write_bytes = write_bytes
+        # маска каналов ШИМ каждого порта
+        self._pwm_mask = array("H", (0 for _ in ports))
+        for ch in channels:
+            if not 0 <= ch < width * len(ports):
+                raise ValueError(f"Неверный номер канала ШИМ: {ch}")
+            self._pwm_mask[ch // width] |= 1 << (ch % width)
+        self._rest = rest_value & port_mask
+        # маска инверсии каждого порта: только каналы ШИМ
+        self._invert = array("H", (mask if active_low else 0 for mask in self._pwm_mask))
+        self._duty = array("H", (0 for _ in range(width * len(ports))))
+        # таблица событий периода ШИМ. Событий не больше, чем каналов плюс по одному на порт в начале периода
+        ev_max = len(channels) + len(ports)
+        self._ev_tick = array("H", (0 for _ in range(ev_max)))
+        self._ev_port = array("B", (0 for _ in range(ev_max)))
+        self._ev_value = array("H", (0 for _ in range(ev_max)))
+        self._ev_count = 0
+        # наибольшее кол-во записей в порты, приходящееся на один тик
+        self._max_writes_per_tick = 0
+        # последние записанные в порты значения
+        self._latch = array("H", (0 for _ in ports))
+        self._latch_valid = False
+        self._counter = self._ev_index = 0
+        self._dirty = True
+        self._timer = None
+        self._tick_ref = self.tick
+        self._rebuild()
+
+    @property
+    def resolution(self) -> int:
+        """Кол-во тиков в периоде ШИМ"""
+        return self._resolution
+
+    def _check_channel(self, channel: int):
+        if not self._pwm_mask[channel // self._width] & (1 << (channel % self._width)):
+            raise ValueError(f"Неверный номер канала ШИМ: {channel}")
+
+    def set_duty(self, channel: int, duty: int):
+        """Устанавливает коэффициент заполнения канала в тиках 0..resolution. Новое значение начинает
+        действовать со следующего периода ШИМ."""
+        self._check_channel(channel)
+        if not 0 <= duty <= self._resolution:
+            raise ValueError(f"Коэффициент заполнения {duty} вне диапазона 0..{self._resolution}!")
+        if self._duty[channel] != duty:
+            self._duty[channel] = duty
+            self._dirty = True
+
+    def get_duty(self, channel: int) -> int:
+        """Возвращает коэффициент заполнения канала в тиках"""
+        self._check_channel(channel)
+        return self._duty[channel]
+
+    def _rebuild(self):
+        """Вычисляет таблицу событий периода ШИМ по коэффициентам заполнения каналов"""
+        width, res, duty = self._width, self._resolution, self._duty
+        ev_tick, ev_port, ev_value = self._ev_tick, self._ev_port, self._ev_value
+        events = []
+        for index in range(len(self._ports)):
+            pwm_mask = self._pwm_mask[index]
+            base = index * width
+            # включенные в начале периода каналы
+            value = 0
+            # маски каналов, выключаемых в тик d: {d: mask}
+            off = {}
+            for bit in range(width):
+                mask = 1 << bit
+                d = duty[base + bit]
+                if not pwm_mask & mask or not d:
+                    continue
+                value |= mask
+                if d < res:
+                    off[d] = off.get(d, 0) | mask
+            value = merge_bits(value, self._rest, pwm_mask ^ bit_mask(0, width))
+            events.append((0, index, value))
+            for d in sorted(off):
+                value ^= off[d]
+                events.append((d, index, value))
+        events.sort()
+        max_writes = cnt = 0
+        prev_tick = -1
+        for i, (t, index, value) in enumerate(events):
+            ev_tick[i], ev_port[i], ev_value[i] = t, index, value ^ self._invert[index]
+            cnt = 1 + cnt if t == prev_tick else 1
+            prev_tick = t
+            max_writes = max(max_writes, cnt)
+        self._ev_count = len(events)
+        self._max_writes_per_tick = max_writes
+        self._dirty = False
+
+    def tick(self, _=None):
+        """Обработка одного тика ШИМ. Вызывается с частотой frequency * resolution (таймером или в цикле).
+        Записывает в порты значения, изменившиеся в этот тик. Память не выделяется, кроме пересчета таблицы
+        событий в начале периода после изменения коэффициентов заполнения."""
+        cnt, i = self._counter, self._ev_index
+        if not cnt:
+            if self._dirty:
+                self._rebuild()
+            i = 0
+        ev_tick, n = self._ev_tick, self._ev_count
+        latch, exp = self._latch, self._expander
+        while i < n and ev_tick[i] == cnt:
+            index = self._ev_port[i]
+            val = self._ev_value[i]
+            if not self._latch_valid or latch[index] != val:
+                exp.write_port(self._ports[index], val)
+                latch[index] = val
+            i += 1
+        if not cnt:
+            self._latch_valid = True
+        cnt += 1
+        self._counter = 0 if cnt == self._resolution else cnt
+        self._ev_index = i
+
+    def writes_per_period(self) -> int:
+        """Возвращает кол-во событий (записей в порт) за период ШИМ при текущих коэффициентах заполнения"""
+        if self._dirty:
+            self._rebuild()
+        return self._ev_count
+
+    def max_frequency(self, bus_hz: int) -> int:
+        """Возвращает наибольшую частоту ШИМ, Гц, при которой обмен по шине с частотой bus_hz укладывается
+        в тик при текущих коэффициентах заполнения. Время выполнения кода Python не учитывается!"""
+        if self._dirty:
+            self._rebuild()
+        # время передачи одного байта по I2C - 9 бит (8 бит данных и ACK)
+        bits_per_write = 9 * self._write_bytes + _I2C_FRAME_OVERHEAD_BITS
+        return bus_hz // (bits_per_write * self._max_writes_per_tick * self._resolution)
+
+    def _on_timer(self, timer):
+        micropython.schedule(self._tick_ref, None)
+
+    def start(self, timer, frequency: int):
+        """Запуск ШИМ по таймеру. timer - экземпляр machine.Timer; frequency - частота ШИМ, Гц.
+        Таймер вызывает tick с частотой frequency * resolution через micropython.schedule."""
+        self.stop()
+        self._counter = self._ev_index = 0
+        self._latch_valid = False
+        self._timer = timer
+        timer.init(freq=frequency * self._resolution, mode=timer.PERIODIC, callback=self._on_timer)
+
+    def stop(self):
+        """Остановка ШИМ. Выводы остаются в последнем записанном состоянии"""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
@@ -0,0 +1,26 @@
+# Тесты выполняются на 'большом' Python (host): модули MicroPython используют свой код без компиляции.
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Модуль micropython есть только в MicroPython. Для тестов декораторы компиляции ничего не делают.
+try:
+    import micropython
+except ImportError:
+    micropython = types.ModuleType("micropython")
+    micropython.native = micropython.viper = lambda func: func
+    micropython.const = lambda value: value
+    micropython.schedule = lambda func, arg: func(arg)
+    sys.modules["micropython"] = micropython
+
+# функции time, которых нет в 'большом' Python
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_us = lambda: int(time.monotonic() * 1_000_000)
+    time.ticks_add = lambda ticks, delta: ticks + delta
+    time.ticks_diff = lambda end, start: end - start
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1_000_000)
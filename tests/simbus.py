@@ -0,0 +1,178 @@
+# Модели расширителей ввода-вывода и шины I2C (machine.I2C) для тестов на host.
+# Модели реализуют только то, что используют драйверы: адресацию регистров, значения после сброса (POR),
+# не реализованные адреса и биты.
+
+
+class SimI2C:
+    """Шина I2C с моделями устройств {адрес: модель}. log - список выполненных операций"""
+
+    def __init__(self, *chips):
+        self.chips = {chip.address: chip for chip in chips}
+        self.log = []
+
+    def scan(self) -> list:
+        return sorted(self.chips)
+
+    def _chip(self, address: int):
+        if address not in self.chips:
+            raise OSError(19)   # ENODEV, нет подтверждения адреса
+        return self.chips[address]
+
+    def readfrom_mem(self, address: int, reg: int, n: int) -> bytes:
+        self.log.append(("rm", address, reg, n))
+        return bytes(self._chip(address).read(reg, n))
+
+    def readfrom_mem_into(self, address: int, reg: int, buf):
+        self.log.append(("rm", address, reg, len(buf)))
+        data = self._chip(address).read(reg, len(buf))
+        for i in range(len(buf)):
+            buf[i] = data[i]
+
+    def writeto_mem(self, address: int, reg: int, buf):
+        self.log.append(("wm", address, reg, bytes(buf)))
+        self._chip(address).write(reg, bytes(buf))
+
+    def readfrom(self, address: int, n: int) -> bytes:
+        self.log.append(("r", address, n))
+        return bytes(self._chip(address).read_raw(n))
+
+    def readfrom_into(self, address: int, buf):
+        self.log.append(("r", address, len(buf)))
+        data = self._chip(address).read_raw(len(buf))
+        for i in range(len(buf)):
+            buf[i] = data[i]
+
+    def writeto(self, address: int, buf) -> int:
+        self.log.append(("w", address, bytes(buf)))
+        self._chip(address).write_raw(bytes(buf))
+        return 1
+
+
+class SimPCF8574:
+    """PCF8574: один регистр, квазидвунаправленные выводы. ext - уровни, задаваемые снаружи (0 - вывод замкнут
+    на землю). Байт 'адреса регистра' записывается в порт."""
+
+    def __init__(self, address: int = 0x38):
+        self.address = address
+        self.ext = 0xFF
+        self.reset()
+
+    def reset(self):
+        self.latch = 0xFF
+
+    def read_raw(self, n: int) -> list:
+        return [self.latch & self.ext] * n
+
+    def write_raw(self, buf: bytes):
+        if buf:
+            self.latch = buf[-1]
+
+    def read(self, reg: int, n: int) -> list:
+        self.latch = reg
+        return self.read_raw(n)
+
+    def write(self, reg: int, buf: bytes):
+        self.write_raw(bytes((reg,)) + buf)
+
+
+class SimXCA9555:
+    """PCA9555/TCA9555: регистры 0..7, используются младшие три бита адреса регистра,
+    указатель переключается внутри пары регистров."""
+
+    def __init__(self, address: int = 0x20):
+        self.address = address
+        self.ext = [0, 0]
+        self.reset()
+
+    def reset(self):
+        # выходы, инверсия, направление (1 - вход)
+        self.regs = [0, 0, 0xFF, 0xFF, 0, 0, 0xFF, 0xFF]
+
+    def _get(self, reg: int) -> int:
+        if reg < 2:
+            cfg = self.regs[6 + reg]
+            return ((self.ext[reg] & cfg) | (self.regs[2 + reg] & ~cfg & 0xFF)) ^ self.regs[4 + reg]
+        return self.regs[reg]
+
+    def read(self, reg: int, n: int) -> list:
+        reg &= 7
+        out = []
+        for _ in range(n):
+            out.append(self._get(reg))
+            reg ^= 1
+        return out
+
+    def write(self, reg: int, buf: bytes):
+        reg &= 7
+        for b in buf:
+            if reg >= 2:
+                self.regs[reg] = b
+            reg ^= 1
+
+
+class SimMCP23017:
+    """MCP23017: 11 пар регистров, адресация IOCON.BANK = 0 (пары соседние) и BANK = 1 (порт B со смещением
+    0x10), IOCON доступен по адресам обоих портов, бит 0 IOCON не реализован, SEQOP = 1 отключает
+    увеличение указателя."""
+
+    def __init__(self, address: int = 0x27):
+        self.address = address
+        self.ext = [0, 0]
+        self.reset()
+
+    def reset(self):
+        # regs[index][port], index: IODIR, IPOL, GPINTEN, DEFVAL, INTCON, IOCON, GPPU, INTF, INTCAP, GPIO, OLAT
+        self.regs = [[0xFF, 0xFF]] + [[0, 0] for _ in range(10)]
+
+    @property
+    def iocon(self) -> int:
+        return self.regs[5][0]
+
+    def _decode(self, addr: int):
+        """Возвращает (индекс, порт) по адресу регистра или None для не реализованного адреса"""
+        if self.iocon & 0x80:
+            index, port = addr & 0x0F, addr >> 4
+            return (index, port) if index < 11 and port < 2 else None
+        return (addr >> 1, addr & 1) if addr < 22 else None
+
+    def _get(self, addr: int) -> int:
+        pos = self._decode(addr)
+        if pos is None:
+            return 0
+        index, port = pos
+        if 9 == index:
+            iodir = self.regs[0][port]
+            return ((self.ext[port] & iodir) ^ self.regs[1][port]) | (self.regs[10][port] & ~iodir & 0xFF)
+        return self.regs[index][port]
+
+    def _set(self, addr: int, value: int):
+        pos = self._decode(addr)
+        if pos is None:
+            return
+        index, port = pos
+        if 5 == index:
+            self.regs[5] = [value & 0xFE, value & 0xFE]
+        elif 9 == index or 10 == index:
+            self.regs[10][port] = value
+        elif index not in (7, 8):
+            self.regs[index][port] = value
+
+    def _next(self, addr: int) -> int:
+        if self.iocon & 0x20:
+            # SEQOP = 1: указатель не увеличивается, при BANK = 0 переключается внутри пары A/B
+            return addr if self.iocon & 0x80 else addr ^ 1
+        if self.iocon & 0x80:
+            return addr + 1 if (addr & 0x0F) < 10 else addr
+        return (addr + 1) % 22
+
+    def read(self, reg: int, n: int) -> list:
+        out = []
+        for _ in range(n):
+            out.append(self._get(reg))
+            reg = self._next(reg)
+        return out
+
+    def write(self, reg: int, buf: bytes):
+        for b in buf:
+            self._set(reg, b)
+            reg = self._next(reg)
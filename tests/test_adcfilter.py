@@ -0,0 +1,46 @@
+# Проверка фильтров sensor_pack_2.adcfilter на длинном потоке отсчетов.
+import random
+from array import array
+
+from sensor_pack_2.adcfilter import CICDecimator
+
+
+def _reference_cic(samples, ratio, order, shift):
+    """CIC без ограничения разрядности интеграторов"""
+    integ, combs, out = [0] * order, [0] * order, []
+    for i, val in enumerate(samples):
+        for k in range(order):
+            val += integ[k]
+            integ[k] = val
+        if 0 == (1 + i) % ratio:
+            for k in range(order):
+                combs[k], val = val, val - combs[k]
+            out.append(val >> shift)
+    return out
+
+
+def _run(flt, samples, block_size):
+    src, dst, out = array("i", (0 for _ in range(block_size))), array("i", (0 for _ in range(block_size))), []
+    for start in range(0, len(samples), block_size):
+        count = min(block_size, len(samples) - start)
+        for i in range(count):
+            src[i] = samples[start + i]
+        out.extend(dst[:flt.process(src, dst, count)])
+    return out
+
+
+def test_cic_long_stream_unsigned():
+    rnd = random.Random(1)
+    # постоянная составляющая на пределе шкалы: без переполнения по модулю интеграторы росли бы бесконечно
+    samples = [0xFFF - rnd.randrange(8) for _ in range(200_000)]
+    flt = CICDecimator(ratio=16, order=3, in_bits=12)
+    assert _run(flt, samples, 64) == _reference_cic(samples, 16, 3, flt._shift)
+    assert all(0 <= v <= flt._reg_mask for v in flt._integrators)
+
+
+def test_cic_long_stream_signed():
+    rnd = random.Random(2)
+    samples = [rnd.choice((-0x8000, 0x7FFF, rnd.randrange(-0x8000, 0x8000))) for _ in range(100_000)]
+    flt = CICDecimator(ratio=8, order=4, extra_bits=2, in_bits=16)
+    assert _run(flt, samples, 100) == _reference_cic(samples, 8, 4, flt._shift)
+    assert all(0 <= v <= flt._reg_mask for v in flt._integrators)
@@ -0,0 +1,20 @@
+# Действие будильника OutputAction на модели PCA9555.
+from sensor_pack_2.bus_service import I2cAdapter
+from sensor_pack_2.ioexpander import port_config_raw
+from sensor_pack_2.alarmsched import OutputAction
+from xca9555mod import XCA9555
+from simbus import SimI2C, SimXCA9555
+
+
+def test_output_action_uses_latch():
+    chip = SimXCA9555(0x20)
+    exp = XCA9555(I2cAdapter(SimI2C(chip)), 0x20)
+    # P0.0..P0.3 - выходы с инверсией чтения, P0.4..P0.7 - входы
+    exp.config_port(0, port_config_raw(direction_reg=0xF0, input_invert_reg=0x0F, pull_reg=None))
+    exp.write_port(0, 0x02)
+    chip.ext[0] = 0xA0
+    OutputAction(exp, 0, 0x01, 0xFF)(0)
+    # входное значение (0xAD) не попадает в выходной регистр
+    assert 0x03 == chip.regs[2]
+    OutputAction(exp, 0, 0x02, 0)(0)
+    assert 0x01 == chip.regs[2]
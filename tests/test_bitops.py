@@ -0,0 +1,54 @@
+# Проверка эквивалентности битовых операций sensor_pack_2.bitops простым эталонным реализациям.
+import itertools
+
+from sensor_pack_2 import bitops
+
+# граничные значения: 0, полные маски, границы ширины порта (8, 16 бит) и 30 бит
+WIDTHS = (0, 1, 7, 8, 9, 15, 16, 17, 29, 30)
+VALUES = (0, 1, 0x55, 0x7F, 0x80, 0xFF, 0x100, 0xAAAA, 0x7FFF, 0x8000, 0xFFFF, 0x10000, 0x2AAAAAAA, 0x3FFFFFFF)
+
+
+def _ref_mask(start, width):
+    return sum(1 << i for i in range(start, start + width))
+
+
+def test_bit_mask():
+    for start, width in itertools.product(range(0, 17), WIDTHS):
+        if start + width <= 30:
+            assert bitops.bit_mask(start, width) == _ref_mask(start, width)
+
+
+def test_extract_insert_bits():
+    for value, start, width in itertools.product(VALUES, (0, 1, 3, 7, 8, 15), WIDTHS):
+        if start + width > 30:
+            continue
+        mask = _ref_mask(start, width)
+        field = (value & mask) >> start
+        assert bitops.extract_bits(value, start, width) == field
+        for dst in (0, 0x3FFFFFFF, 0x15555555):
+            expected = (dst & ~mask) | ((value << start) & mask)
+            assert bitops.insert_bits(dst, value, start, width) == expected
+            assert bitops.extract_bits(bitops.insert_bits(dst, field, start, width), start, width) == field
+
+
+def test_merge_bits():
+    for dst, value, mask in itertools.product(VALUES, VALUES, VALUES):
+        assert bitops.merge_bits(dst, value, mask) == (dst & ~mask) | (value & mask)
+
+
+def test_popcount():
+    for value in VALUES:
+        assert bitops.popcount(value) == bin(value).count("1")
+
+
+def test_reverse_bits():
+    for value, width in itertools.product(VALUES, WIDTHS):
+        ref = int(format(value & _ref_mask(0, width), f"0{width}b")[::-1], 2) if width else 0
+        assert bitops.reverse_bits(value, width) == ref
+
+
+def test_edges():
+    for prev, curr in itertools.product(VALUES, VALUES):
+        assert bitops.changed_bits(prev, curr) == prev ^ curr
+        assert bitops.rising_edges(prev, curr) == ~prev & curr
+        assert bitops.falling_edges(prev, curr) == prev & ~curr
@@ -0,0 +1,39 @@
+# Проверка частоты обновления WaveformPlayer в пакетном режиме.
+import pytest
+from sensor_pack_2.dacmod import DAC
+from sensor_pack_2.dacwave import WaveformPlayer, make_ramp_table
+
+
+class _BurstDAC(DAC):
+    def __init__(self):
+        super().__init__(resolution=12)
+
+    def get_burst_size(self) -> int:
+        return 4
+
+
+class _Timer:
+    PERIODIC = 1
+
+    def init(self, freq, mode, callback):
+        self.freq = freq
+
+    def deinit(self):
+        pass
+
+
+@pytest.mark.parametrize("rate", (2, 1001))
+def test_rate_not_multiple_of_burst(rate):
+    dac = _BurstDAC()
+    with pytest.raises(ValueError):
+        WaveformPlayer(dac, make_ramp_table(dac, 16), rate)
+
+
+def test_timer_frequency():
+    dac = _BurstDAC()
+    timer = _Timer()
+    player = WaveformPlayer(dac, make_ramp_table(dac, 16), 1000)
+    player.start(timer)
+    assert 250 == timer.freq
+    # без пакетного режима ограничения нет
+    assert 1 == WaveformPlayer(dac, make_ramp_table(dac, 16), 1001, burst=False).burst_size
@@ -0,0 +1,116 @@
+# Обнаружение сброса расширителей (healthmod) и копия состояния драйверов на моделях микросхем.
+import pytest
+
+from sensor_pack_2.bus_service import I2cAdapter
+from sensor_pack_2.ioexpander import port_config_raw
+from xca9555mod import XCA9555
+from mcp23x17mod import MCP23x17
+from pcf8574mod import PCF8574
+from healthmod import HealthMonitor
+from simbus import SimI2C, SimXCA9555, SimMCP23017, SimPCF8574
+
+
+def _xca():
+    chip = SimXCA9555(0x20)
+    exp = XCA9555(I2cAdapter(SimI2C(chip)), 0x20)
+    exp.config_port(0, port_config_raw(direction_reg=0x0F, input_invert_reg=0x01, pull_reg=None))
+    exp.config_port(1, port_config_raw(direction_reg=0xF0, input_invert_reg=0x00, pull_reg=None))
+    exp.write_port(0, 0x50)
+    exp.write_port(1, 0x0A)
+    return chip, exp
+
+
+def _mcp():
+    chip = SimMCP23017(0x27)
+    exp = MCP23x17(I2cAdapter(SimI2C(chip)), 0x27)
+    exp.config_port(0, port_config_raw(direction_reg=0x00, input_invert_reg=0x00, pull_reg=0x00))
+    exp.config_port(1, port_config_raw(direction_reg=0x0F, input_invert_reg=0x03, pull_reg=0x0F))
+    exp.write_port(0, 0x3C)
+    exp.write_port(1, 0x50)
+    return chip, exp
+
+
+def _pcf():
+    chip = SimPCF8574(0x38)
+    exp = PCF8574(I2cAdapter(SimI2C(chip)), 0x38)
+    exp.write_port(0, 0xF0)
+    return chip, exp
+
+
+def _registers(chip):
+    if isinstance(chip, SimPCF8574):
+        return chip.latch
+    if isinstance(chip, SimXCA9555):
+        return list(chip.regs)
+    # IODIR, IPOL, IOCON, GPPU, OLAT. Настройка прерываний не входит в копию состояния
+    return [list(chip.regs[i]) for i in (0, 1, 5, 6, 10)]
+
+
+@pytest.mark.parametrize("make", (_xca, _mcp, _pcf))
+def test_no_reset(make):
+    chip, exp = make()
+    before = _registers(chip)
+    monitor = HealthMonitor()
+    monitor.add(exp)
+    for _ in range(3):
+        assert monitor.check(exp)
+    assert 0 == monitor.resets
+    assert _registers(chip) == before
+
+
+@pytest.mark.parametrize("make", (_xca, _mcp, _pcf))
+def test_reset_restores_state(make):
+    chip, exp = make()
+    expected = _registers(chip)
+    monitor = HealthMonitor()
+    monitor.add(exp)
+    chip.reset()
+    assert not monitor.check(exp)
+    assert 1 == monitor.resets
+    assert _registers(chip) == expected
+    assert monitor.check(exp)
+    assert 1 == monitor.resets
+
+
+@pytest.mark.parametrize("make", (_xca, _mcp, _pcf))
+def test_fingerprint_after_reset(make):
+    chip, exp = make()
+    exp.save_state()
+    buf = bytearray(exp.fingerprint_size)
+    assert exp.read_fingerprint(buf)
+    chip.reset()
+    assert not exp.read_fingerprint(buf)
+    exp.restore_state()
+    assert exp.read_fingerprint(buf)
+
+
+def test_save_state_reads_chip():
+    chip, exp = _xca()
+    # настройка в обход драйвера
+    chip.regs[3] = 0x77
+    chip.regs[7] = 0x80
+    exp.save_state()
+    assert 0x77 == exp.read_port_latch(1)
+    chip.reset()
+    exp.restore_state()
+    assert 0x77 == chip.regs[3] and 0x80 == chip.regs[7]
+
+
+def test_mcp_restore_without_reset_keeps_outputs():
+    chip, exp = _mcp()
+    exp.save_state()
+    bus = exp._device.adapter.bus
+    bus.log.clear()
+    exp.restore_state()
+    # IOCON записывается только по адресу IOCON при BANK = 1, OLATA (0x0A) не изменяется значением IOCON
+    assert ("wm", 0x27, 0x0A, bytes((exp._iocon,))) not in bus.log
+    assert 0x3C == chip.regs[10][0] and 0x50 == chip.regs[10][1]
+
+
+def test_pcf_low_output_pulled_high_is_reset():
+    chip, exp = _pcf()
+    monitor = HealthMonitor()
+    monitor.add(exp)
+    chip.latch = 0xFF
+    assert not monitor.check(exp)
+    assert 0xF0 == chip.latch
@@ -0,0 +1,60 @@
+# Преобразование буфера 'сырого' времени RTC (BCDTimeCodec).
+import pytest
+
+from sensor_pack_2.irtc import BCDTimeCodec, RtcTime, rtc_time
+
+# раскладка регистров времени DS3231
+DS3231 = (("sec", 0x7F), ("min", 0x7F), ("hour", 0x3F), ("day_of_week", 0x07), ("day", 0x3F), ("month", 0x1F),
+          ("year", 0xFF))
+
+
+@pytest.mark.parametrize("t", (
+    rtc_time(2000, 1, 1, 0, 0, 0, 1, 1),
+    rtc_time(2024, 2, 29, 23, 59, 59, 4, 60),
+    rtc_time(2023, 12, 31, 12, 30, 45, 7, 365),
+    rtc_time(2099, 12, 31, 1, 2, 3, 5, 365),
+))
+def test_round_trip(t):
+    codec = BCDTimeCodec(DS3231)
+    buf = codec.encode_into(t, bytearray(len(codec)))
+    assert codec.decode(buf) == t
+    into = RtcTime()
+    assert codec.decode(buf, into=into) is into
+    assert tuple(into[i] for i in range(len(into))) == tuple(t)
+
+
+def test_encode_keeps_flag_bits():
+    codec = BCDTimeCodec(DS3231)
+    buf = bytearray(len(codec))
+    buf[5] = 0x80   # бит 'век' в регистре месяца
+    codec.encode_into(rtc_time(2024, 7, 15, 8, 9, 10, 1, 197), buf)
+    assert 0x87 == buf[5]
+    assert 7 == codec.decode(buf).month
+
+
+@pytest.mark.parametrize("month", (0x00, 0x13, 0x14, 0x19))
+def test_invalid_month(month):
+    codec = BCDTimeCodec(DS3231)
+    buf = bytearray((0x10, 0x20, 0x03, 0x01, 0x15, month, 0x24))
+    assert codec.decode(buf) is None
+    assert 0 == codec.decode(buf, check=False).day_of_year
+
+
+@pytest.mark.parametrize("day", (0x00, 0x32, 0x39))
+def test_invalid_day(day):
+    codec = BCDTimeCodec(DS3231)
+    buf = bytearray((0x10, 0x20, 0x03, 0x01, day, 0x06, 0x24))
+    assert codec.decode(buf) is None
+
+
+def test_invalid_bcd():
+    codec = BCDTimeCodec(DS3231)
+    assert codec.decode(bytearray((0x1A, 0x20, 0x03, 0x01, 0x15, 0x06, 0x24))) is None
+
+
+def test_time_only_layout():
+    codec = BCDTimeCodec((("sec", 0x7F), ("min", 0x7F), ("hour", 0x3F)))
+    buf = bytearray((0x10, 0x20, 0x03))
+    for _ in range(2):
+        t = codec.decode(buf)
+        assert (0, 3, 20, 10, 0) == (t.year, t.hour, t.min, t.sec, t.day_of_year)
@@ -0,0 +1,43 @@
+# Таблица событий программной ШИМ (SoftPWM).
+from sensor_pack_2.bus_service import I2cAdapter
+from pcf8574mod import PCF8574
+from xca9555mod import XCA9555
+from swpwmmod import SoftPWM
+from simbus import SimI2C, SimPCF8574, SimXCA9555
+
+
+def _events(pwm):
+    pwm.writes_per_period()     # пересчет таблицы
+    return [(pwm._ev_tick[i], pwm._ev_port[i], pwm._ev_value[i]) for i in range(pwm._ev_count)]
+
+
+def test_active_low_keeps_rest_value():
+    exp = PCF8574(I2cAdapter(SimI2C(SimPCF8574(0x38))), 0x38)
+    # каналы P0..P3, на P4..P7 - входы (в выходном регистре единицы)
+    pwm = SoftPWM(exp, ports=(0,), channels=(0, 1, 2, 3), resolution=10, rest_value=0xF0, active_low=True)
+    pwm.set_duty(0, 5)
+    pwm.set_duty(1, 5)
+    pwm.set_duty(2, 10)
+    # в начале периода включены каналы 0..2 (0 на выводе), канал 3 выключен (1 на выводе)
+    # в тик 5 выключаются каналы 0 и 1
+    assert [(0, 0, 0xF8), (5, 0, 0xFB)] == _events(pwm)
+
+
+def test_active_high_rest_value():
+    exp = XCA9555(I2cAdapter(SimI2C(SimXCA9555(0x20))), 0x20)
+    pwm = SoftPWM(exp, ports=(0, 1), channels=(0, 9), resolution=4, rest_value=0x80)
+    pwm.set_duty(0, 1)
+    pwm.set_duty(9, 3)
+    assert [(0, 0, 0x81), (0, 1, 0x82), (1, 0, 0x80), (3, 1, 0x80)] == _events(pwm)
+
+
+def test_active_low_tick_writes():
+    chip = SimPCF8574(0x38)
+    exp = PCF8574(I2cAdapter(SimI2C(chip)), 0x38)
+    pwm = SoftPWM(exp, channels=(7,), resolution=4, rest_value=0x7F, active_low=True)
+    pwm.set_duty(7, 2)
+    values = []
+    for _ in range(4):
+        pwm.tick()
+        values.append(chip.latch)
+    assert [0x7F, 0x7F, 0xFF, 0xFF] == values
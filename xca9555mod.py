@@ -2,9 +2,15 @@
 
 from sensor_pack_2.bus_service import BusAdapter
 from sensor_pack_2.base_sensor import DeviceEx
-from sensor_pack_2.ioexpander import IOExpander, port_config_raw, port_config_addr
+from sensor_pack_2.ioexpander import IOExpander, port_config_raw, port_config_addr, PortConfigRaw
 from sensor_pack_2.base_sensor import check_value
 
+# адреса регистров портов 0 и 1: входы, выходы, настройка
+_in_addr = (0, 1)
+_out_addr = (2, 3)
+_cfg_addr = (port_config_addr(direction_reg=6, input_invert_reg=4, pull_reg=None),
+             port_config_addr(direction_reg=7, input_invert_reg=5, pull_reg=None))
+
 
 class XCA9555(IOExpander):
     """Класс, управляющий I2C IO-Expander. Чип генерирует прерывания при любом изменении состояния цифровых ВХОДОВ!
@@ -14,55 +20,78 @@ class XCA9555(IOExpander):
         check_value(address, range(0x20, 0x28), f"Неверное значение адреса I2C устройства: 0x{address:x}")
         super().__init__(port_count=2, port_width=8)
         self._device = DeviceEx(adapter, address, True)
+        # буфер для чтения обоих входных регистров одной транзакцией (snapshot)
+        self._snap_buf = bytearray(2)
 
     def _get_io_port_addr(self, n_port: int, op_read: bool = True) -> int:
         """Возвращает адрес порта ввода-вывода по его номеру и операции.
         Если op_read Истина, то производится чтение, иначе Запись."""
         self._check_port_numb(n_port)
-        if op_read:
-            return n_port
-        # op_read is False (writing)
-        return 2 + n_port
+        return (_out_addr, _in_addr)[op_read][n_port]
 
     def _get_config_addr(self, n_port: int) -> port_config_addr:
         """Возвращает адрес порта настройки/конфигурации в адресном пространстве расширителя ввода-вывода"""
         self._check_port_numb(n_port)
-        return port_config_addr(direction_reg=6 + n_port, input_invert_reg=4 + n_port, pull_reg=None)
+        return _cfg_addr[n_port]
 
     # IOExpander
 
-    def get_port_value(self) -> int:
-        """Возвращает содержимое регистра ввода(DI))"""
-        n_port = self.get_active_port()
-        addr = self._get_io_port_addr(n_port=n_port, op_read=True)
-        raw = self._device.read_reg(reg_addr=addr, bytes_count=1)
-        return raw[0]
-
-    def set_port_value(self, value: int):
-        """Устанавливает содержимое регистра порта вывода(DO)"""
-        n_port = self.get_active_port()
-        addr = self._get_io_port_addr(n_port=n_port, op_read=False)
-        self._device.write_reg(reg_addr=addr, value=value, bytes_count=1)
-
-    def set_port_config_raw(self, config: port_config_raw):
-        """Записывает в соотв. регистры настройки(!) текущего активного порта значения в 'сыром' виде."""
-        n_port = self.get_active_port()
+    def read_port(self, n_port: int) -> int:
+        """Возвращает содержимое регистра ввода(DI)) порта n_port"""
+        self._check_port_numb(n_port)
+        return self._device.read_reg(reg_addr=_in_addr[n_port], bytes_count=1)[0]
+
+    def write_port(self, n_port: int, value: int):
+        """Устанавливает содержимое регистра порта вывода(DO) n_port"""
+        self._check_port_numb(n_port)
+        self._device.write_reg(reg_addr=_out_addr[n_port], value=value, bytes_count=1)
+        self._state_out[n_port] = value
+
+    def snapshot(self, into, start: int = 0) -> int:
+        """Записывает значения входов обоих портов в into[start], into[start + 1].
+        Одна транзакция: чтение двух байт с адреса 0, указатель регистра переключается внутри пары 0/1."""
+        buf = self._snap_buf
+        self._device.read_buf_from_mem(0, buf)
+        into[start] = buf[0]
+        into[1 + start] = buf[1]
+        return 2 + start
+
+    def config_port(self, n_port: int, config: port_config_raw):
+        """Записывает в соотв. регистры настройки(!) порта n_port значения в 'сыром' виде."""
         cfg_addr = self._get_config_addr(n_port)
-        # print(f"cfg_addr: {cfg_addr}")
         _write_reg = self._device.write_reg
         if not config.direction_reg is None:
             _write_reg(reg_addr=cfg_addr.direction_reg, value=config.direction_reg, bytes_count=1)
         if not config.input_invert_reg is None:
             _write_reg(reg_addr=cfg_addr.input_invert_reg, value=config.input_invert_reg, bytes_count=1)
+        self._update_state_cfg(n_port, config)
 
-    def get_port_config_raw(self) -> port_config_raw:
-        """Возвращает содержимое регистров настройки(!) текущего активного порта в сыром виде."""
-        n_port = self.get_active_port()
+    def read_port_config(self, n_port: int, into: PortConfigRaw = None) -> [port_config_raw, PortConfigRaw]:
+        """Возвращает содержимое регистров настройки(!) порта n_port в сыром виде.
+        Если into не None, то значения записываются в него и возвращается into."""
         cfg_addr = self._get_config_addr(n_port)
         _read_reg = self._device.read_reg
         #
         _dir = _read_reg(reg_addr=cfg_addr.direction_reg, bytes_count=1)[0]
         _inv = _read_reg(reg_addr=cfg_addr.input_invert_reg, bytes_count=1)[0]
         #
-        return port_config_raw(direction_reg=_dir, input_invert_reg=_inv, pull_reg=None)
+        if into is None:
+            return port_config_raw(direction_reg=_dir, input_invert_reg=_inv, pull_reg=None)
+        into.direction_reg, into.input_invert_reg, into.pull_reg = _dir, _inv, None
+        return into
+
+    # RESET DETECTION
+    fingerprint_size = 2
+    fingerprint_cost = 5    # адрес + регистр 6, адрес + регистры 6, 7
+
+    def read_port_latch(self, n_port: int) -> int:
+        """Возвращает содержимое выходного регистра порта n_port"""
+        self._check_port_numb(n_port)
+        return self._device.read_reg(reg_addr=_out_addr[n_port], bytes_count=1)[0]
 
+    def read_fingerprint(self, buf) -> bool:
+        """Читает регистры направления 6 и 7 в buf одной транзакцией. После сброса все выводы - входы (0xFF).
+        Возвращает Ложь, если они не совпадают с копией состояния (смотри save_state)."""
+        self._device.read_buf_from_mem(6, buf)
+        state = self._state_cfg
+        return buf[0] == state[0].direction_reg and buf[1] == state[1].direction_reg